@@ -0,0 +1,316 @@
+"""
+micro benchmarks for `textual_extensions.core.event_engine`.
+
+it doesn't need a terminal, all cases run in a bare asyncio loop.
+
+cmd:
+    python3 benchmarks/bench_event_engine.py [-o <output.json>]
+        [--baseline <baseline.json>] [--threshold 0.15] [--quick]
+        [--filter <substring>]
+    
+    -o: write the results to a json file (otherwise print to stdout).
+    --baseline: compare with a previous result. exit with code 1 if any
+        case's throughput drops more than `--threshold` (ratio).
+    --quick: 1/10 iterations, for smoke testing.
+    --filter: only run cases whose name contains the substring.
+
+example:
+    python3 benchmarks/bench_event_engine.py -o base.json
+    # ... change something ...
+    python3 benchmarks/bench_event_engine.py --baseline base.json
+"""
+import asyncio
+import json
+import os
+import platform
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from time import perf_counter_ns
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+# noinspection PyUnresolvedReferences
+from textual_extensions.core.event_engine import SignalSupport  # noqa: E402
+# noinspection PyUnresolvedReferences
+from textual_extensions.core.event_engine import emit  # noqa: E402
+# noinspection PyUnresolvedReferences
+from textual_extensions.core.event_engine import listen  # noqa: E402
+# noinspection PyUnresolvedReferences
+from textual_extensions.core.event_engine import signal  # noqa: E402
+# noinspection PyUnresolvedReferences
+from textual_extensions.core.event_engine import unlisten  # noqa: E402
+
+SUBSCRIBER_COUNTS = (1, 10, 100, 1000, 10000)
+LATENCY_SAMPLES = 2000
+WORK_UNITS = 200_000  # (emits * subscribers) per case, roughly.
+
+
+# -----------------------------------------------------------------------------
+# measurement
+
+async def measure(emit_once, iterations) -> dict:
+    """
+    args:
+        emit_once: async func() -> None
+        iterations: int. the number of emits for throughput measurement.
+    returns: dict
+        {'iterations': int, 'ops_per_sec': float,
+         'p50_us': float, 'p99_us': float}
+    """
+    for _ in range(min(iterations, 100)):  # warm up
+        await emit_once()
+    
+    samples = []
+    for _ in range(min(iterations, LATENCY_SAMPLES)):
+        t = perf_counter_ns()
+        await emit_once()
+        samples.append(perf_counter_ns() - t)
+    samples.sort()
+    
+    start = perf_counter()
+    for _ in range(iterations):
+        await emit_once()
+    elapsed = perf_counter() - start
+    
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 1),
+        'p50_us': round(samples[len(samples) // 2] / 1000, 3),
+        'p99_us': round(samples[int(len(samples) * 0.99)] / 1000, 3),
+    }
+
+
+def iterations_for(subscribers, scale):
+    return max(20, int(WORK_UNITS * scale) // subscribers)
+
+
+# -----------------------------------------------------------------------------
+# cases
+
+def _sync_handler(*_):
+    pass
+
+
+async def _async_handler(*_):
+    pass
+
+
+class _Holder:
+    # bound methods are the most common callbacks in widgets.
+    def on_sync(self, *_):
+        pass
+    
+    async def on_async(self, *_):
+        pass
+
+
+async def case_emit(kind, subscribers, scale):
+    s = signal(int)
+    holders = []  # keep bound method owners alive.
+    for i in range(subscribers):
+        h = _Holder()
+        holders.append(h)
+        if kind == 'sync' or (kind == 'mixed' and i % 2 == 0):
+            s.connect(h.on_sync)
+        else:
+            s.connect(h.on_async)
+    result = await measure(
+        lambda: s.emit(1), iterations_for(subscribers, scale)
+    )
+    del holders
+    return result
+
+
+async def case_emit_functions(kind, subscribers, scale):
+    s = signal(int)
+    handler = _sync_handler if kind == 'sync' else _async_handler
+    for _ in range(subscribers):
+        # a distinct closure per subscriber, so they are not deduplicated.
+        s.connect(_wrap(handler))
+    return await measure(
+        lambda: s.emit(1), iterations_for(subscribers, scale)
+    )
+
+
+def _wrap(func):
+    if asyncio.iscoroutinefunction(func):
+        async def wrapper(*args):
+            await func(*args)
+    else:
+        def wrapper(*args):
+            func(*args)
+    return wrapper
+
+
+async def case_chain(depth, scale):
+    # signals are connected weakly, the list keeps the middle ones alive
+    # (otherwise they are collected and the chain is cut after the head).
+    chain = [signal(int) for _ in range(depth + 1)]
+    for s, nxt in zip(chain, chain[1:]):
+        s.connect(nxt)
+    chain[-1].connect(_sync_handler)
+    return await measure(
+        lambda: chain[0].emit(1), iterations_for(depth + 1, scale)
+    )
+
+
+async def case_global(subscribers, patterns, scale):
+    listeners = [
+        ('bench.global.event', _wrap(_sync_handler))
+        for _ in range(subscribers)
+    ]
+    listeners.extend(
+        ('bench.other{}.*'.format(i), _sync_handler) for i in range(patterns)
+    )
+    if patterns:
+        listeners.append(('bench.**', _sync_handler))
+    for name, callback in listeners:
+        listen(name, callback)
+    try:
+        # `emit` returns a task in the loop thread, awaiting it waits for all
+        # listeners.
+        return await measure(
+            lambda: emit('bench.global.event', 1),
+            iterations_for(subscribers + 1, scale)
+        )
+    finally:
+        # global listeners outlive the case, remove them so the next case
+        # measures only its own.
+        for name, callback in listeners:
+            unlisten(name, callback)
+
+
+async def case_construct(scale):
+    class W(SignalSupport):
+        on_clicked = signal()
+        on_pressed = signal(int)
+        on_released = signal(int)
+    
+    class W2(W):
+        on_checked = signal(int)
+    
+    n = max(1000, int(10_000 * scale * 10))
+    
+    async def construct():
+        W2()
+    
+    async def construct_and_connect():
+        w = W2()
+        w.on_clicked.connect(_sync_handler)
+    
+    a = await measure(construct, n)
+    b = await measure(construct_and_connect, n // 10)
+    return {'construct': a, 'construct_and_connect': b}
+
+
+def build_cases(scale):
+    """
+    returns: list[tuple[str name, async func() -> dict]]
+    """
+    cases = []
+    for kind in ('sync', 'async', 'mixed'):
+        for n in SUBSCRIBER_COUNTS:
+            cases.append((
+                'emit.method.{}.{}'.format(kind, n),
+                lambda k=kind, n=n: case_emit(k, n, scale)
+            ))
+    for kind in ('sync', 'async'):
+        for n in (1, 100):
+            cases.append((
+                'emit.function.{}.{}'.format(kind, n),
+                lambda k=kind, n=n: case_emit_functions(k, n, scale)
+            ))
+    for depth in (1, 5, 10):
+        cases.append((
+            'chain.{}'.format(depth),
+            lambda d=depth: case_chain(d, scale)
+        ))
+    for subs, patterns in ((1, 0), (100, 0), (1, 100)):
+        cases.append((
+            'global.{}.patterns{}'.format(subs, patterns),
+            lambda s=subs, p=patterns: case_global(s, p, scale)
+        ))
+    cases.append(('signal_support', lambda: case_construct(scale)))
+    return cases
+
+
+# -----------------------------------------------------------------------------
+
+async def run(scale, name_filter=None) -> dict:
+    results = {}
+    for name, case in build_cases(scale):
+        if name_filter and name_filter not in name:
+            continue
+        result = await case()
+        if 'ops_per_sec' in result:
+            results[name] = result
+        else:  # a case reports multiple sub-results.
+            for k, v in result.items():
+                results['{}.{}'.format(name, k)] = v
+        print('{:<40} done'.format(name), file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold) -> list:
+    """
+    returns: list[tuple[str name, float old, float new, float ratio]]
+        the regressed cases.
+    """
+    regressions = []
+    print('\n{:<48} {:>14} {:>14} {:>8}'.format(
+        'case', 'baseline op/s', 'current op/s', 'ratio'
+    ), file=sys.stderr)
+    for name, new in results.items():
+        if (old := baseline.get(name)) is None:
+            continue
+        ratio = new['ops_per_sec'] / old['ops_per_sec']
+        flag = ''
+        if ratio < 1 - threshold:
+            flag = '  <- regression'
+            regressions.append(
+                (name, old['ops_per_sec'], new['ops_per_sec'], ratio)
+            )
+        print('{:<48} {:>14.1f} {:>14.1f} {:>8.2f}{}'.format(
+            name, old['ops_per_sec'], new['ops_per_sec'], ratio, flag
+        ), file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-o', '--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--filter')
+    args = parser.parse_args()
+    
+    results = asyncio.run(run(0.1 if args.quick else 1.0, args.filter))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        if regressions := compare(results, baseline, args.threshold):
+            print('\n{} regression(s) found.'.format(len(regressions)),
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,24 @@
+from .blink_clock import BlinkClock
+from .blink_clock import blink_clock
+from .event_engine import BroadcastError
+from .event_engine import Coalesce
+from .event_engine import Debounce
+from .event_engine import FanOut
+from .event_engine import Queued
 from .event_engine import SignalSupport
+from .event_engine import Throttle
 from .event_engine import emit
 from .event_engine import event_bus
 from .event_engine import listen
 from .event_engine import signal
+from .event_engine import unlisten
+from .log_sink import FileSink
+from .logger import LogRecord
 from .logger import Logger
 from .logger import log
 from .logger import logf
+from .logger import set_logf_level
+from .recorder import Recorder
+from .recorder import TraceReader
+from .recorder import replay
+from .recorder import wait_idle
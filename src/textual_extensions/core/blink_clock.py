@@ -0,0 +1,77 @@
+"""
+a process-wide clock for blinking cursors (and other periodic animations).
+
+usage:
+    class MyWidget(Widget):
+        def on_blink(self, phase: bool):
+            ...  # phase: True means visible.
+            self.refresh()
+        
+        async def watch__focused(self, focus):
+            if focus:
+                blink_clock.add(self)
+            else:
+                blink_clock.remove(self)
+
+widgets register only while they need ticks (focused or animating). the
+clock has no timer when nobody is registered, so the number of widgets
+doesn't matter for idle cpu and wakeups. all registered widgets receive the
+same phase, so their cursors blink in sync.
+"""
+from asyncio import get_running_loop
+from weakref import WeakSet
+
+__all__ = ['BlinkClock', 'blink_clock']
+
+
+class BlinkClock:
+    
+    def __init__(self, interval=0.6):
+        """
+        args:
+            interval: float. seconds between two ticks. suggest 0.5~0.7.
+        """
+        self.interval = interval
+        self.phase = True  # True means visible (solid cursor).
+        self._handle = None  # optional[asyncio.TimerHandle]
+        self._widgets = WeakSet()  # WeakSet[<has method `on_blink`>]
+    
+    def __len__(self):
+        return len(self._widgets)
+    
+    def add(self, widget):
+        """ must be called in the loop thread. """
+        self._widgets.add(widget)
+        if self._handle is None:
+            loop = get_running_loop()
+            self.phase = True
+            self._handle = loop.call_at(
+                loop.time() + self.interval, self._tick, loop
+            )
+    
+    def remove(self, widget):
+        self._widgets.discard(widget)
+        if not self._widgets and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+    
+    def _tick(self, loop):
+        if not self._widgets:  # all registered widgets are collected.
+            self._handle = None
+            return
+        self.phase = phase = not self.phase
+        for widget in tuple(self._widgets):
+            try:
+                widget.on_blink(phase)
+            except Exception as e:
+                loop.call_exception_handler({
+                    'message': 'exception in blink clock',
+                    'exception': e,
+                })
+        # schedule from the planned time, not from now, so it doesn't drift.
+        self._handle = loop.call_at(
+            self._handle.when() + self.interval, self._tick, loop
+        )
+
+
+blink_clock = BlinkClock()
@@ -1,5 +1,12 @@
+from .events import BroadcastError
+from .events import FanOut
 from .events import event_bus
+from .policies import Coalesce
+from .policies import Debounce
+from .policies import Queued
+from .policies import Throttle
 from .signal import SignalSupport
 from .signal import emit
 from .signal import listen
 from .signal import signal
+from .signal import unlisten
@@ -0,0 +1,121 @@
+"""
+hierarchical channel names for global signals.
+
+names are dotted paths, for example 'fs.scan.progress'. a listener can use
+wildcards in its name:
+    '*'     matches exactly one segment. 'fs.*' matches 'fs.scan' but not
+            'fs.scan.progress'.
+    '**'    matches zero or more segments. 'fs.**' matches 'fs',
+            'fs.scan' and 'fs.scan.progress'.
+
+the wildcard patterns are indexed in a prefix trie. the patterns matching a
+concrete name are resolved once, then cached (the latest `cache_size` names)
+until a pattern is added or removed. so emitting doesn't need to scan all
+patterns.
+
+each pattern carries a value (the bus channel of the pattern, for example
+'global#fs.*'), `ChannelTrie.resolve` returns the values directly.
+"""
+from collections import OrderedDict
+
+__all__ = ['ChannelTrie', 'is_pattern']
+
+
+def is_pattern(name: str) -> bool:
+    return '*' in name
+
+
+class ChannelTrie:
+    
+    def __init__(self, cache_size=1024):
+        """
+        args:
+            cache_size: int. names like 'job.<id>.done' are endless, so the
+                cache only keeps the recently resolved ones.
+        """
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # OrderedDict[str name, tuple[value, ...]]
+        self._patterns = {}  # dict[str pattern, value]
+        self._root = _Node()
+    
+    def __contains__(self, pattern):
+        return pattern in self._patterns
+    
+    def add(self, pattern: str, value=None):
+        """
+        adding an existing pattern does nothing.
+        
+        args:
+            value: any. None means using pattern itself.
+        """
+        if pattern in self._patterns:
+            return
+        value = pattern if value is None else value
+        self._patterns[pattern] = value
+        node = self._root
+        for seg in pattern.split('.'):
+            if seg not in node.children:
+                node.children[seg] = _Node()
+            node = node.children[seg]
+        node.value = value
+        self._cache.clear()
+    
+    def remove(self, pattern: str):
+        if self._patterns.pop(pattern, None) is None:
+            return
+        path = [self._root]
+        for seg in pattern.split('.'):
+            path.append(path[-1].children[seg])
+        path[-1].value = None
+        # prune the empty branch bottom-up.
+        segs = pattern.split('.')
+        for i in range(len(segs), 0, -1):
+            node = path[i]
+            if node.value is not None or node.children:
+                break
+            del path[i - 1].children[segs[i - 1]]
+        self._cache.clear()
+    
+    def resolve(self, name: str) -> tuple:
+        """
+        returns: tuple[value, ...]
+            the values of the patterns matching this name, in a stable order.
+            the name itself is excluded, even if it's also a pattern.
+        """
+        if not self._patterns:
+            return ()
+        cache = self._cache
+        try:
+            out = cache[name]
+        except KeyError:
+            found = {}  # use dict as an ordered set.
+            self._match(self._root, name.split('.'), 0, found)
+            if name in self._patterns:
+                found.pop(self._patterns[name], None)
+            out = cache[name] = tuple(found)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(name)
+        return out
+    
+    def _match(self, node, parts, i, out):
+        if (child := node.children.get('**')) is not None:
+            for j in range(i, len(parts) + 1):
+                self._match(child, parts, j, out)
+        if i == len(parts):
+            if node.value is not None:
+                out[node.value] = None
+            return
+        if (child := node.children.get(parts[i])) is not None:
+            self._match(child, parts, i + 1, out)
+        if (child := node.children.get('*')) is not None:
+            self._match(child, parts, i + 1, out)
+
+
+class _Node:
+    __slots__ = ('children', 'value')
+    
+    def __init__(self):
+        self.children = {}  # dict[str segment, _Node]
+        self.value = None  # not None if a pattern ends at this node.
@@ -1,42 +1,555 @@
-class EventBusA:
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from inspect import iscoroutinefunction
+from inspect import ismethod
+from itertools import groupby
+from itertools import repeat
+from weakref import WeakMethod
+
+
+class EventBusB:
+    """
+    the asyncio based event bus.
+    
+    callbacks run inline in the loop by default, a subscription can choose
+    another execution backend by `executor` (see `subscribe`).
+    """
     
     def __init__(self):
-        from collections import defaultdict
-        from concurrent.futures import ThreadPoolExecutor
-        self._events = defaultdict(set)  # dict[str channel, set[callback]]
-        self._pool = ThreadPoolExecutor(max_workers=3)
+        self._events = {}  # dict[str channel, _Channel]
+        self._executors = {}  # dict[literal['thread', 'process'], Executor]
+        #   the shared pools, created lazily.
+        self._labels = {}  # dict[channel, str]. readable names for reports.
+        self._emptied_hooks = []  # list[callable[[channel], None]]
+        #   see `add_emptied_hook`.
+        self._loop = None  # optional[asyncio.AbstractEventLoop]
+        #   the loop that runs all callbacks. it is bound automatically when
+        #   something subscribes or broadcasts in a running loop (and when a
+        #   widget is created, see `widgets/widget.py`), or call `bind_loop`
+        #   explicitly.
+        self._tasks = set()  # set[asyncio.Task]
+        self._thread_queue = deque()
+        #   deque[tuple[channel, tuple args, dict kwargs]]. events emitted from
+        #   other threads. `deque.append` and `deque.popleft` are atomic, so no
+        #   lock is needed.
+        self._wakeup_scheduled = False
+    
+    def bind_loop(self, loop=None):
+        """
+        args:
+            loop: optional[asyncio.AbstractEventLoop]
+                None: use the running loop (must be called in loop thread).
+        """
+        self._loop = loop or asyncio.get_running_loop()
+    
+    def try_bind_loop(self) -> bool:
+        """
+        bind the running loop if the bus has no (open) loop yet. it's cheap,
+        and does nothing outside a running loop.
+        
+        returns: bool. True if the bus has a loop now.
+        """
+        if self._loop is None or self._loop.is_closed():
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return False
+        return True
+    
+    def subscribe(self, channel, callback, is_async=None, weak=True,
+                  executor=None, priority=0) -> bool:
+        """
+        args:
+            is_async: optional[bool]
+                None: auto detect (see `is_async_callable`).
+                True/False: force the dispatch kind. this is useful for
+                    callbacks that are not coroutine functions but return an
+                    awaitable, for example `lambda: widget.focus()`.
+            weak: bool[True]
+                if callback is a bound method, only hold a weak reference to
+                its owner. the subscription is removed automatically when the
+                owner is garbage collected.
+                note: plain functions, lambdas and partials are always held
+                strongly (otherwise an inline lambda would die immediately).
+            executor: literal['inline', 'thread', 'process'] | Executor | None
+                where to run the callback:
+                    None, 'inline': in the loop thread (default).
+                    'thread': the shared thread pool. for blocking io.
+                    'process': the shared process pool. for cpu-bound
+                        handlers, the callback and emitted args must be
+                        picklable.
+                    an `concurrent.futures.Executor` instance.
+                the emitter awaits the result as it awaits an async callback,
+                exceptions raised in the executor are re-raised in the loop.
+                only sync callbacks can be run in an executor.
+            priority: int[0]
+                subscribers with higher priority are called first, no matter
+                sync or async. the ones with the same priority are called in
+                subscription order, except that sync ones go before async
+                ones (see `_dispatch`).
+        returns: True if it's a new subscription, False if it replaced an
+            existing one (the same callback).
+        """
+        # so that worker threads can emit before anything is broadcast.
+        self.try_bind_loop()
+        if is_async is None:
+            is_async = is_async_callable(callback)
+        key = _callback_key(callback)
+        if weak and ismethod(callback):
+            ref = WeakMethod(callback, partial(self._prune, channel, key))
+        else:
+            # a strong "reference" which has the same calling protocol with
+            # `weakref.ref`, and is implemented in C.
+            ref = repeat(callback).__next__
+        if executor is not None and executor != 'inline':
+            if is_async:
+                raise ValueError(
+                    'async callback cannot run in an executor: {}'.format(
+                        callback
+                    )
+                )
+            ref = _Offload(self, ref, executor)
+            is_async = True
+        return self._get_channel(channel).add(key, ref, is_async, priority)
     
-    def subscribe(self, channel, callback):
-        self._events[channel].add(callback)
+    def unsubscribe(self, channel, callback) -> bool:
+        """
+        returns: True if callback was subscribed, False if not found.
+        """
+        if (ch := self._events.get(channel)) is None:
+            return False
+        if not ch.remove(_callback_key(callback)):
+            return False
+        if not ch.subscribers:
+            self._on_emptied(channel, ch)
+        return True
     
-    def broadcast(self, channel, *args, **kwargs):
-        self._pool.submit(self._consume, channel, *args, **kwargs)
+    def add_emptied_hook(self, hook):
+        """
+        args:
+            hook: callable[[channel], None]. called when a channel loses its
+                last subscriber, by `unsubscribe` or because a weakly
+                referenced owner was collected.
+        """
+        self._emptied_hooks.append(hook)
+    
+    def clear(self, channel):
+        """ remove the channel with all its subscribers and settings. """
+        self._events.pop(channel, None)
+        self._labels.pop(channel, None)
+    
+    def _prune(self, channel, key, _ref):
+        # called by `WeakMethod` when the owner of a bound method is collected.
+        if (ch := self._events.get(channel)) is not None:
+            ch.prune(key)
+            if not ch.subscribers:
+                self._on_emptied(channel, ch)
+    
+    def _on_emptied(self, channel, ch):
+        if ch.fanout is None and ch.policy is None:
+            del self._events[channel]
+        for hook in self._emptied_hooks:
+            hook(channel)
+    
+    def set_fanout(self, channel, fanout):
+        """
+        args:
+            fanout: optional[FanOut]
+                None: await async subscribers one by one (default).
+                FanOut: run async subscribers concurrently.
+        """
+        self._get_channel(channel).fanout = fanout
+    
+    def set_policy(self, channel, policy):
+        """
+        args:
+            policy: optional[.policies.Policy]
+                None: deliver every emit immediately (default).
+                Policy: a fresh policy instance owned by this channel. see
+                    `.policies.make_policy`.
+        """
+        self._get_channel(channel).policy = policy
+    
+    async def broadcast(self, channel, *args, **kwargs):
+        # also replaces a closed loop, e.g. after a second `asyncio.run`.
+        self.try_bind_loop()
+        if (ch := self._events.get(channel)) is None:
+            return
+        if ch.policy is None:
+            await self._dispatch(ch, channel, args, kwargs)
+        else:
+            await ch.policy.submit(self, channel, args, kwargs)
     
-    def _consume(self, channel, *args, **kwargs):
-        for callback in self._events[channel]:
-            callback(*args, **kwargs)
+    async def dispatch(self, channel, args, kwargs):
+        """
+        deliver to subscribers right now, bypassing the channel's policy.
+        this is called by policies when they flush the pending emit.
+        """
+        if (ch := self._events.get(channel)) is not None:
+            await self._dispatch(ch, channel, args, kwargs)
+    
+    def emit_threadsafe(self, channel, *args, **kwargs):
+        """
+        broadcast from any thread. the callbacks run in the bound loop.
+        
+        the events are put into a queue, and drained in batches on the loop.
+        only the first event of a batch wakes up the loop (by
+        `call_soon_threadsafe`), the rest of the batch just append to the
+        queue.
+        """
+        if (loop := self._loop) is None:
+            raise RuntimeError(
+                'event bus is not bound to a loop, subscribe (or create a '
+                'widget) in the loop thread, or call `event_bus.bind_loop()` '
+                'there.'
+            )
+        self._thread_queue.append((channel, args, kwargs))
+        if not self._wakeup_scheduled:
+            # note: there's a race that two threads both schedule a wakeup,
+            #   it is harmless: the second drain finds an empty queue.
+            self._wakeup_scheduled = True
+            loop.call_soon_threadsafe(self._drain_thread_queue)
+    
+    # -------------------------------------------------------------------------
+    # instrumentation
+    
+    @property
+    def stats(self):
+        """ optional[.stats.BusStats]. None if not enabled. """
+        return self.__dict__.get('_stats')
+    
+    def enable_stats(self, slow_threshold=16.0, max_slow_reports=100):
+        """
+        start recording per-channel counters and per-handler latency
+        histograms. see `.stats.BusStats`.
+        
+        args:
+            slow_threshold: float. milliseconds.
+        returns: BusStats
+        """
+        from .stats import BusStats
+        stats = self._stats = BusStats(
+            self, slow_threshold, max_slow_reports
+        )
+        # shadow the class-level `_dispatch` by an instance attribute. when
+        # stats is disabled, the attribute is deleted, so the normal path has
+        # no "if stats enabled" check at all.
+        self._dispatch = stats.dispatch
+        return stats
+    
+    def disable_stats(self):
+        self.__dict__.pop('_stats', None)
+        self.__dict__.pop('_dispatch', None)
+    
+    def count_subscribers(self, channel) -> int:
+        if (ch := self._events.get(channel)) is None:
+            return 0
+        return len(ch)
+    
+    def get_label(self, channel) -> str:
+        return self._labels.get(channel) or str(channel)
+    
+    def set_label(self, channel, label):
+        self._labels[channel] = label
+    
+    # -------------------------------------------------------------------------
     
     def close(self):
-        self._pool.shutdown()
+        """ shutdown the shared executors. """
+        for pool in self._executors.values():
+            pool.shutdown()
+        self._executors.clear()
+    
+    def get_executor(self, executor) -> Executor:
+        if isinstance(executor, Executor):
+            return executor
+        if executor not in self._executors:
+            if executor == 'thread':
+                self._executors[executor] = ThreadPoolExecutor(
+                    max_workers=3, thread_name_prefix='event_bus'
+                )
+            elif executor == 'process':
+                self._executors[executor] = ProcessPoolExecutor()
+            else:
+                raise ValueError('invalid executor: {}'.format(executor))
+        return self._executors[executor]
+    
+    def spawn(self, coro) -> asyncio.Task:
+        """
+        run a coroutine as a task in background, hold its strong reference
+        until it's done, and report its exception to the loop's exception
+        handler.
+        """
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        return task
+    
+    def _drain_thread_queue(self):
+        # reset the flag before draining, so an event appended after this
+        # point schedules a new wakeup instead of being left in the queue.
+        self._wakeup_scheduled = False
+        batch = []
+        try:
+            while True:
+                batch.append(self._thread_queue.popleft())
+        except IndexError:
+            pass
+        if batch:
+            self.spawn(self._broadcast_batch(batch))
+    
+    async def _broadcast_batch(self, batch):
+        for channel, args, kwargs in batch:
+            await self.broadcast(channel, *args, **kwargs)
+    
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            task.get_loop().call_exception_handler({
+                'message': 'exception in event bus task',
+                'exception': e,
+                'task': task,
+            })
+    
+    @staticmethod
+    async def _dispatch(ch, channel, args, kwargs):
+        # note: `.stats.BusStats.dispatch` is a timed copy of this loop, keep
+        #   them in sync.
+        # note: the dispatch tables are tuples, it's safe if a callback
+        #   subscribes new callbacks to this channel during broadcasting.
+        #   the entries are references, a dead weak reference returns None.
+        for sync_refs, async_refs in ch.groups:
+            for ref in sync_refs:
+                if (callback := ref()) is not None:
+                    callback(*args, **kwargs)
+            if ch.fanout is None:
+                for ref in async_refs:
+                    if (callback := ref()) is not None:
+                        await callback(*args, **kwargs)
+            elif async_refs:
+                await ch.fanout.run(channel, tuple(
+                    callback for ref in async_refs
+                    if (callback := ref()) is not None
+                ), args, kwargs)
+    
+    def _get_channel(self, channel):
+        if channel not in self._events:
+            self._events[channel] = _Channel()
+        return self._events[channel]
 
 
-class EventBusB:
+class _Channel:
+    """
+    the subscribers of a channel, and its precompiled dispatch tables.
+    
+    the dispatch tables are rebuilt only when subscribers changed, so that
+    `EventBusB.broadcast` doesn't need to check the callback kind or the
+    priority for every emit.
+    """
+    __slots__ = (
+        'fanout', 'groups', 'policy', 'subscribers', '_dead', '_min_priority',
+    )
     
     def __init__(self):
-        from collections import defaultdict
-        self._events = defaultdict(set)
-        #   dict[str channel, set[tuple[func callback, bool is_async]]]
+        self.fanout = None  # optional[FanOut]
+        self.policy = None  # optional[.policies.Policy]
+        self.subscribers = {}
+        #   dict[key, tuple[ref, bool is_async, int priority]]
+        #   key: see `_callback_key`.
+        #   ref: func() -> optional[callback]. weak or strong reference.
+        self.groups = ()
+        #   tuple[tuple[tuple[ref, ...] sync, tuple[ref, ...] async], ...]
+        #   the dispatch tables, one group per priority level, from high to
+        #   low. usually there is only one group.
+        self._dead = 0  # the number of dead references in dispatch tables.
+        self._min_priority = float('inf')
+        #   the priority of the last group, used to detect if a new
+        #   subscriber can be simply appended to the tail.
     
-    def subscribe(self, channel, callback, is_async=False):
-        # PERF: can i auto detect if callback is async?
-        self._events[channel].add((callback, is_async))
+    def __len__(self):
+        return len(self.subscribers)
     
-    async def broadcast(self, channel, *args, **kwargs):
-        for (callback, is_async) in self._events[channel]:
-            if is_async:
-                await callback(*args, **kwargs)
+    def add(self, key, ref, is_async, priority=0) -> bool:
+        """ returns: False if it replaced an existing subscriber. """
+        # re-subscribing moves the callback to the end of its priority group.
+        replaced = self.subscribers.pop(key, None) is not None
+        self.subscribers[key] = (ref, is_async, priority)
+        if replaced or priority > self._min_priority:
+            self._compile()
+            return not replaced
+        # fast path: the new one goes to the tail, the order of others
+        # doesn't change. this avoids o(n^2) when subscribing thousands of
+        # callbacks.
+        if priority == self._min_priority:
+            *head, (sync_refs, async_refs) = self.groups
+        else:
+            head, sync_refs, async_refs = self.groups, (), ()
+            self._min_priority = priority
+        if is_async:
+            async_refs += (ref,)
+        else:
+            sync_refs += (ref,)
+        self.groups = (*head, (sync_refs, async_refs))
+        return True
+    
+    def remove(self, key) -> bool:
+        if (entry := self.subscribers.pop(key, None)) is None:
+            return False
+        ref = entry[0]
+        # removing doesn't change the order of others, no need to sort again.
+        self.groups = tuple(
+            (
+                tuple(x for x in sync_refs if x is not ref),
+                tuple(x for x in async_refs if x is not ref),
+            )
+            for sync_refs, async_refs in self.groups
+        )
+        return True
+    
+    def prune(self, key):
+        """
+        remove a subscriber whose weak reference is dead.
+        
+        a dead reference resolves to None and is skipped in dispatching, so
+        the dispatch tables don't need to be rebuilt right now. they are
+        rebuilt when dead entries take up half of them. this keeps pruning
+        amortized o(1) when thousands of widgets are collected together.
+        """
+        if self.subscribers.pop(key, None) is None:
+            return
+        self._dead += 1
+        # the tables hold `len(self.subscribers) + self._dead` entries.
+        if self._dead > len(self.subscribers):
+            self._compile()
+    
+    def _compile(self):
+        # `sorted` is stable, the subscription order is kept for the same
+        # priority.
+        ordered = sorted(self.subscribers.values(), key=lambda x: -x[2])
+        self._dead = 0
+        self._min_priority = ordered[-1][2] if ordered else float('inf')
+        groups = []
+        for _, group in groupby(ordered, key=lambda x: x[2]):
+            group = tuple(group)
+            groups.append((
+                tuple(ref for ref, is_async, _ in group if not is_async),
+                tuple(ref for ref, is_async, _ in group if is_async),
+            ))
+        self.groups = tuple(groups)
+
+
+class _Offload:
+    """
+    a reference-like object (see `_Channel.subscribers`), it resolves to an
+    async callable which runs the referenced callback in an executor.
+    """
+    __slots__ = ('bus', 'executor', 'ref')
+    
+    def __init__(self, bus, ref, executor):
+        self.bus = bus
+        self.executor = executor
+        self.ref = ref
+    
+    def __call__(self):
+        if (callback := self.ref()) is None:
+            return None
+        return partial(self._run, callback)
+    
+    async def _run(self, callback, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.bus.get_executor(self.executor),
+            partial(callback, *args, **kwargs)
+        )
+
+
+class FanOut:
+    """
+    run the async subscribers of a channel concurrently, so the emit latency
+    equals to the slowest handler instead of the sum of all handlers.
+    
+    exceptions (including timeouts) are collected, all handlers are finished
+    (or timed out) before a `BroadcastError` is raised.
+    """
+    
+    def __init__(self, limit=None, timeout=None):
+        """
+        args:
+            limit: optional[int]
+                max number of handlers running at the same time. None means
+                no limit.
+            timeout: optional[float]
+                timeout in seconds for each handler. None means no timeout.
+        """
+        assert limit is None or limit > 0
+        self.limit = limit
+        self.timeout = timeout
+    
+    async def run(self, channel, callbacks, args, kwargs):
+        # note: the semaphore is created per run, because asyncio primitives
+        #   are bound to the running loop in python 3.8/3.9.
+        sem = asyncio.Semaphore(self.limit) if self.limit else None
+        
+        async def call(callback):
+            if sem is None:
+                await self._call(callback, args, kwargs)
             else:
-                callback(*args, **kwargs)
+                async with sem:
+                    await self._call(callback, args, kwargs)
+        
+        results = await asyncio.gather(
+            *map(call, callbacks), return_exceptions=True
+        )
+        if errors := [x for x in results if isinstance(x, BaseException)]:
+            raise BroadcastError(channel, errors)
+    
+    async def _call(self, callback, args, kwargs):
+        if self.timeout is None:
+            await callback(*args, **kwargs)
+        else:
+            await asyncio.wait_for(callback(*args, **kwargs), self.timeout)
+
+
+class BroadcastError(Exception):
+    
+    def __init__(self, channel, errors):
+        super().__init__(
+            '{} handler(s) of channel {!r} failed: {}'.format(
+                len(errors), channel, '; '.join(map(repr, errors))
+            )
+        )
+        self.channel = channel
+        self.errors = errors  # list[BaseException]
+
+
+def _callback_key(callback):
+    """
+    bound methods are created on every attribute access (`a.f is not a.f`), so
+    we identify them by their owner and function. this also makes it possible
+    to find a weakly referenced subscription without resolving its ref.
+    """
+    if ismethod(callback):
+        return id(callback.__self__), callback.__func__
+    return callback
+
+
+def is_async_callable(callback) -> bool:
+    """
+    check if callback is a coroutine function. it supports:
+        - `async def` functions.
+        - bound async methods (including `signal.emit`, which is used by
+          signal-to-signal connections).
+        - `functools.partial` wraps any of above (nested is ok).
+        - callable objects which define `async def __call__`.
+    """
+    while isinstance(callback, partial):
+        callback = callback.func
+    if iscoroutinefunction(callback):
+        return True
+    return iscoroutinefunction(getattr(type(callback), '__call__', None))
 
 
 event_bus = EventBusB()
@@ -0,0 +1,235 @@
+"""
+delivery policies for high-frequency signals.
+
+a policy decides *when* an emitted value is delivered to subscribers. all
+policies except the immediate one are latest-wins: the channel keeps one
+pending slot, a newer emit overwrites the older (not yet delivered) one.
+
+usage:
+    from textual_extensions import signal, Debounce
+    on_moved = signal(int, int, policy='coalesce')
+    on_searched = signal(str, policy=Debounce(200))
+
+note: with a non-immediate policy, `await signal.emit(...)` returns right
+after the value is stored, it doesn't wait for the handlers.
+
+besides the latest-wins policies, `Queued` keeps every value in a bounded
+fifo queue, and delivers them one by one in a background task.
+"""
+import asyncio
+from collections import deque
+from time import monotonic
+
+__all__ = [
+    'Coalesce', 'Debounce', 'Policy', 'Queued', 'Throttle', 'make_policy'
+]
+
+
+class Policy:
+    _pending: tuple  # optional[tuple[tuple args, dict kwargs]]
+    
+    def __init__(self):
+        self._pending = None
+    
+    def clone(self) -> 'Policy':
+        """ create a fresh instance with the same config but no state. """
+        return self.__class__()
+    
+    async def submit(self, bus, channel, args, kwargs):
+        raise NotImplementedError
+    
+    def _flush(self, bus, channel):
+        if self._pending is None:
+            return
+        args, kwargs = self._pending
+        self._pending = None
+        bus.spawn(bus.dispatch(channel, args, kwargs))
+
+
+class Coalesce(Policy):
+    """
+    deliver the latest value once per event-loop iteration.
+    """
+    _scheduled: bool
+    
+    def __init__(self):
+        super().__init__()
+        self._scheduled = False
+    
+    async def submit(self, bus, channel, args, kwargs):
+        self._pending = (args, kwargs)
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._tick, bus, channel)
+    
+    def _tick(self, bus, channel):
+        self._scheduled = False
+        self._flush(bus, channel)
+
+
+class Debounce(Policy):
+    """
+    deliver the latest value after there's no emit in the last `ms`
+    milliseconds.
+    """
+    _handle: asyncio.TimerHandle
+    
+    def __init__(self, ms: float):
+        super().__init__()
+        self.ms = ms
+        self._handle = None
+    
+    def clone(self):
+        return Debounce(self.ms)
+    
+    async def submit(self, bus, channel, args, kwargs):
+        self._pending = (args, kwargs)
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = asyncio.get_running_loop().call_later(
+            self.ms / 1000, self._flush, bus, channel
+        )
+
+
+class Throttle(Policy):
+    """
+    deliver at most once per `ms` milliseconds. the first emit is delivered
+    right away (in the next loop iteration), the latest value in the rest of
+    the window is delivered at the end of the window.
+    """
+    _handle: asyncio.TimerHandle
+    _last: float
+    
+    def __init__(self, ms: float):
+        super().__init__()
+        self.ms = ms
+        self._handle = None
+        self._last = 0.0
+    
+    def clone(self):
+        return Throttle(self.ms)
+    
+    async def submit(self, bus, channel, args, kwargs):
+        self._pending = (args, kwargs)
+        if self._handle is not None:
+            return  # the trailing delivery is already scheduled.
+        loop = asyncio.get_running_loop()
+        wait = self._last + self.ms / 1000 - monotonic()
+        self._handle = loop.call_later(max(wait, 0), self._tick, bus, channel)
+    
+    def _tick(self, bus, channel):
+        self._handle = None
+        self._last = monotonic()
+        self._flush(bus, channel)
+
+
+class Queued(Policy):
+    """
+    deliver every value in order through a bounded queue.
+    
+    the emitter returns as soon as the value is queued (or dropped), a
+    background task delivers the queued values one by one, and yields to the
+    loop between two deliveries, so a flood of events (e.g. from a scanner)
+    cannot starve other handlers (e.g. keyboard).
+    """
+    dropped: int  # how many values are dropped since created.
+    
+    def __init__(self, size: int, overflow='drop_oldest'):
+        """
+        args:
+            size: int. the max number of pending values.
+            overflow: literal['drop_oldest', 'drop_newest', 'block']
+                what to do when the queue is full:
+                    drop_oldest: drop the oldest pending value.
+                    drop_newest: drop the value being emitted.
+                    block: the emitter waits until there is free space.
+        """
+        assert size > 0
+        assert overflow in ('drop_oldest', 'drop_newest', 'block')
+        super().__init__()
+        self.size = size
+        self.overflow = overflow
+        self.dropped = 0
+        self._consumer = None  # optional[asyncio.Task]
+        self._queue = deque()  # deque[tuple[tuple args, dict kwargs]]
+        self._waiters = deque()  # deque[asyncio.Future]. blocked emitters.
+    
+    def __len__(self):
+        return len(self._queue)
+    
+    def clone(self):
+        return Queued(self.size, self.overflow)
+    
+    async def submit(self, bus, channel, args, kwargs):
+        if len(self._queue) >= self.size:
+            if self.overflow == 'drop_newest':
+                self.dropped += 1
+                return
+            elif self.overflow == 'drop_oldest':
+                self._queue.popleft()
+                self.dropped += 1
+            else:
+                loop = asyncio.get_running_loop()
+                while len(self._queue) >= self.size:
+                    waiter = loop.create_future()
+                    self._waiters.append(waiter)
+                    try:
+                        await waiter
+                    except asyncio.CancelledError:
+                        if waiter in self._waiters:
+                            self._waiters.remove(waiter)
+                        else:
+                            # it was woken up already, pass the free slot
+                            # to the next one.
+                            self._wake_one()
+                        raise
+        self._queue.append((args, kwargs))
+        if self._consumer is None:
+            self._consumer = bus.spawn(self._consume(bus, channel))
+    
+    async def _consume(self, bus, channel):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._queue:
+                args, kwargs = self._queue.popleft()
+                self._wake_one()
+                try:
+                    await bus.dispatch(channel, args, kwargs)
+                except Exception as e:
+                    # keep consuming, a broken handler shouldn't block the
+                    # rest of the queue.
+                    loop.call_exception_handler({
+                        'message': 'exception in Queued delivery',
+                        'exception': e,
+                    })
+                await asyncio.sleep(0)
+        finally:
+            self._consumer = None
+            # the queue is empty (or the consumer is cancelled). wake the next
+            # blocked emitter, it starts a new consumer, which wakes the rest
+            # in order.
+            self._wake_one()
+    
+    def _wake_one(self):
+        # skip the waiters which are done (cancelled emitters).
+        while self._waiters:
+            if not (waiter := self._waiters.popleft()).done():
+                waiter.set_result(None)
+                return
+
+
+def make_policy(spec):
+    """
+    args:
+        spec: literal['immediate', 'coalesce'] | Policy | None
+    returns:
+        optional[Policy]: a fresh instance (None for immediate). policies are
+            stateful, every channel must own its instance.
+    """
+    if spec is None or spec == 'immediate':
+        return None
+    if spec == 'coalesce':
+        return Coalesce()
+    if isinstance(spec, Policy):
+        return spec.clone()
+    raise ValueError('invalid delivery policy: {}'.format(spec))
@@ -1,14 +1,29 @@
+from asyncio import get_running_loop
+from weakref import finalize
+
+from .channels import ChannelTrie
+from .channels import is_pattern
+from .events import FanOut
 from .events import event_bus
+from .policies import make_policy
 
 _signal_count = 0  # a simple auto increment counter for generating signal ids.
 
 
 class SignalSupport:
+    """
+    make class-level signals per-instance.
+    
+    the class-level signals are descriptors (see `signal.__get__`), the
+    per-instance signal is created lazily on its first access (usually the
+    first `connect` or `emit`), so constructing a widget costs nothing for
+    its signals.
+    """
+    
     def __init__(self):
-        for k, v in self.__class__.__dict__.items():
-            if k.endswith('ed'):
-                if isinstance(v, signal):
-                    self.__dict__[k] = signal()
+        # nothing to do here, it is kept for subclasses calling
+        # `SignalSupport.__init__(self)` explicitly.
+        pass
 
 
 # noinspection PyPep8Naming
@@ -23,12 +38,9 @@ class signal:
             -   use passive tense. (i.e. the name ends with 'ed', for example
                 'clicked', 'pressed', 'released', etc.)
                 notice:
-                    this is a MANDATORY format. for names which is not
-                    'ed'-ended, it won't be detected, then it may lead to
-                    unexpected behaviors.
-                    this is because we have implemented a magic method to
-                    accept only 'ed'-ended names. see also `../../widgets/
-                    widget.py : class Widget` for more information.
+                    this is not mandatory since 0.1.0+ (class-level signals
+                    are resolved by descriptor, no matter what its name is),
+                    but we still recommend it.
             -   suggest using 'on_' as common prefix. for example 'on_clicked',
                 'on_pressed', 'on_released', etc.
                 
@@ -41,38 +53,209 @@ class signal:
                 ...
         the only thing keeps in mind is that using `from textual_extensions
         import Widget`, instead of `from textual.widget import Widget`.
-        you can check its source code to find how is it implemented.
+        you can check `SignalSupport` and `signal.__get__` to find how is it
+        implemented.
     """
     _annotations: tuple
     _id: int  # FIXME
+    _name: str  # optional[str]. the attribute name in class-level declaration.
+    _names: tuple  # tuple[str, ...]. all names, including aliases.
+    _options: dict
+    _owner: str  # optional[str]. the class name of the owner instance.
     
-    def __init__(self, *annotations):
+    def __init__(self, *annotations, concurrent=False, max_concurrency=None,
+                 timeout=None, policy=None):
+        """
+        args:
+            annotations: the types of emitted args. (for documentation only.)
+            concurrent: bool[False]
+                False: async handlers are awaited one by one.
+                True: async handlers are run concurrently, see also
+                    `..events.FanOut`. the exceptions are collected and raised
+                    as a `BroadcastError` after all handlers are done.
+            max_concurrency: optional[int]
+                only works when `concurrent` is True.
+            timeout: optional[float]
+                timeout in seconds for each async handler. only works when
+                `concurrent` is True.
+            policy: literal['immediate', 'coalesce'] | .policies.Policy | None
+                the delivery policy for high-frequency signals, for example
+                `'coalesce'`, `Debounce(200)`, `Throttle(16)` or
+                `Queued(100, 'drop_oldest')`. None means 'immediate'. see also
+                `.policies`.
+        """
         global _signal_count
         _signal_count += 1
         self._annotations = annotations
         self._id = _signal_count
+        self._name = None
+        self._names = ()
+        self._owner = None
+        self._options = dict(
+            concurrent=concurrent,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            policy=policy,
+        )
+        if concurrent:
+            event_bus.set_fanout(self._id, FanOut(max_concurrency, timeout))
+        if policy is not None:
+            event_bus.set_policy(self._id, make_policy(policy))
+        # remove the channel (with all its subscribers) when this signal dies.
+        finalize(self, event_bus.clear, self._id)
+    
+    def __set_name__(self, owner, name):
+        # called once per name, `on_a = on_b = signal()` gives two names.
+        if self._name is None:
+            self._name = name
+        self._names += (name,)
+    
+    def __get__(self, instance, owner=None):
+        if instance is None or not isinstance(instance, SignalSupport):
+            return self
+        cls = type(instance)
+        names = tuple(
+            x for x in self._names if getattr(cls, x, None) is self
+        ) or self._find_names(cls)
+        if not names:  # not reachable by attribute, use the shared one.
+            return self
+        # create the per-instance signal and cache it in `instance.__dict__`,
+        # under all its names (aliases share one signal). since this is a
+        # non-data descriptor, the next lookups will hit the instance dict
+        # directly and won't come here again.
+        new = signal(*self._annotations, **self._options)
+        new._name = names[0]
+        for name in names:
+            instance.__dict__[name] = new
+        # the label is formatted only when the signal is connected, see
+        # `connect`.
+        new._owner = type(instance).__name__
+        return new
     
-    def connect(self, callback, is_async=False):
-        # FIXME: asyncio.coroutine.iscoroutine function is not available to
-        #   check if the callback is a coroutine. (i don't know why)
-        #   so if you are passing an async callback, you must set
-        #   `is_async=True` explicitly.
+    def _find_names(self, cls) -> tuple:
+        """
+        find the names of this signal in `cls`, for signals which are
+        attached after the class is created (`__set_name__` is not called
+        for them).
+        """
+        names = tuple(dict.fromkeys(
+            k for klass in cls.__mro__
+            for k, v in vars(klass).items() if v is self
+        ))
+        self._names += names
+        if self._name is None and names:
+            self._name = names[0]
+        return names
+    
+    @property
+    def label(self) -> str:
+        """ a readable name for reports, e.g. 'Button.on_clicked#12'. """
+        if self._owner is None:
+            return str(self._id)
+        return '{}.{}#{}'.format(self._owner, self._name, self._id)
+    
+    def connect(self, callback, is_async=None, weak=True, executor=None,
+                priority=0):
+        """
+        args:
+            callback: callable or signal.
+            is_async: optional[bool]
+                None: auto detect if callback is a coroutine function.
+                True: force treating callback as async. use this only when
+                    callback is a normal function that returns an awaitable.
+            weak: bool[True]
+                bound methods (and signals) are weakly referenced, they are
+                disconnected automatically when their owner is garbage
+                collected. set False to keep the owner alive.
+            executor: literal['inline', 'thread', 'process'] | Executor | None
+                run callback off the loop, for cpu-heavy or blocking handlers.
+                see `EventBusB.subscribe`.
+            priority: int[0]
+                higher priority is called first. see `EventBusB.subscribe`.
+        """
+        if self._owner is not None:
+            event_bus.set_label(self._id, self.label)
         if isinstance(callback, signal):
-            event_bus.subscribe(self._id, callback.emit, True)
+            event_bus.subscribe(
+                self._id, callback.emit, True, weak, priority=priority
+            )
         else:
-            event_bus.subscribe(self._id, callback, is_async)
+            event_bus.subscribe(
+                self._id, callback, is_async, weak, executor, priority
+            )
+    
+    def disconnect(self, callback) -> bool:
+        """
+        returns: True if callback was connected, False if not.
+        """
+        if isinstance(callback, signal):
+            return event_bus.unsubscribe(self._id, callback.emit)
+        else:
+            return event_bus.unsubscribe(self._id, callback)
     
     async def emit(self, *args, **kwargs):
         await event_bus.broadcast(self._id, *args, **kwargs)
+    
+    def emit_threadsafe(self, *args, **kwargs):
+        """ emit from a worker thread. see `EventBusB.emit_threadsafe`. """
+        event_bus.emit_threadsafe(self._id, *args, **kwargs)
 
 
 # -----------------------------------------------------------------------------
 # global signal
 # this would be friendly to simple use cases.
 
+_patterns = ChannelTrie()  # the wildcard names of global listeners.
+
+
 def listen(name, callback):
+    """
+    args:
+        name: a dotted name, wildcards are allowed. for example
+            'fs.scan.progress', 'fs.*', 'fs.**'. see `.channels`.
+    """
     event_bus.subscribe(f'global#{name}', callback)
+    if is_pattern(name):
+        _patterns.add(name, f'global#{name}')
+
+
+def unlisten(name, callback) -> bool:
+    # the pattern leaves `_patterns` with its last listener, see
+    # `_on_channel_emptied`.
+    return event_bus.unsubscribe(f'global#{name}', callback)
+
+
+def _on_channel_emptied(channel):
+    # also called when a weakly referenced listener is collected.
+    if isinstance(channel, str) and channel.startswith('global#'):
+        _patterns.remove(channel[7:])
+
+
+event_bus.add_emptied_hook(_on_channel_emptied)
 
 
 def emit(name, *args, **kwargs):
-    event_bus.broadcast(f'global#{name}', *args, **kwargs)
+    """
+    emit a global signal. it can be called from any thread:
+        - in the loop thread: the broadcast is scheduled as a task, and the
+          task is returned (awaiting it is optional).
+        - in other threads: see `EventBusB.emit_threadsafe`. returns None.
+    
+    the listeners of `name` and of all wildcard names matching `name` are
+    notified, in this order.
+    """
+    channels = (f'global#{name}',) + _patterns.resolve(name)
+    try:
+        loop = get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None and event_bus.try_bind_loop() and \
+            event_bus._loop is loop:
+        return event_bus.spawn(_broadcast_all(channels, args, kwargs))
+    for channel in channels:
+        event_bus.emit_threadsafe(channel, *args, **kwargs)
+
+
+async def _broadcast_all(channels, args, kwargs):
+    for channel in channels:
+        await event_bus.broadcast(channel, *args, **kwargs)
@@ -0,0 +1,213 @@
+"""
+opt-in instrumentation for the event bus.
+
+usage:
+    from textual_extensions import event_bus
+    stats = event_bus.enable_stats(slow_threshold=10)  # ms
+    ...
+    print(stats.to_json())
+    event_bus.disable_stats()
+
+when disabled (default), the bus doesn't know this module exists, the hot
+path pays nothing. when enabled, the bus swaps its dispatcher with
+`BusStats.dispatch`, which times every handler.
+"""
+import json
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from time import perf_counter
+from time import time
+
+from .events import _Offload
+
+__all__ = ['BusStats']
+
+
+class BusStats:
+    BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 500)
+    #   the upper bounds (ms) of histogram buckets. there is one more bucket
+    #   for the values above the last bound.
+    
+    def __init__(self, bus, slow_threshold=16.0, max_slow_reports=100):
+        """
+        args:
+            slow_threshold: float. in milliseconds. handlers exceeding this are
+                reported in `self.slow_reports`.
+            max_slow_reports: int. only keep the latest n reports.
+        """
+        self.slow_threshold = slow_threshold
+        self.slow_reports = deque(maxlen=max_slow_reports)
+        #   deque[dict]. see `self._record`.
+        self._bus = bus
+        self._channels = {}  # dict[channel, list[int emits, float total_ms]]
+        self._handlers = {}  # dict[tuple[channel, str handler], _Histogram]
+        self._since = time()
+    
+    async def dispatch(self, ch, channel, args, kwargs):
+        """
+        a drop-in replacement of `EventBusB._dispatch` with timing. it's a
+        copy (not a wrapper) so the normal path stays untouched, keep the two
+        loops in sync.
+        """
+        counter = self._channels.setdefault(channel, [0, 0.0])
+        counter[0] += 1
+        start = perf_counter()
+        try:
+            for sync_refs, async_refs in ch.groups:
+                for ref in sync_refs:
+                    if (callback := ref()) is not None:
+                        await self._timed(channel, callback, args, kwargs)
+                if ch.fanout is None:
+                    for ref in async_refs:
+                        if (callback := ref()) is not None:
+                            await self._timed(
+                                channel, callback, args, kwargs, True
+                            )
+                elif async_refs:
+                    await ch.fanout.run(channel, tuple(
+                        partial(self._timed_async, channel, callback)
+                        for ref in async_refs
+                        if (callback := ref()) is not None
+                    ), args, kwargs)
+        finally:
+            counter[1] += (perf_counter() - start) * 1000
+    
+    async def _timed(self, channel, callback, args, kwargs, is_async=False):
+        t = perf_counter()
+        try:
+            if is_async:
+                await callback(*args, **kwargs)
+            else:
+                callback(*args, **kwargs)
+        finally:
+            self._record(channel, callback, perf_counter() - t)
+    
+    async def _timed_async(self, channel, callback, *args, **kwargs):
+        # the calling protocol of `FanOut.run`.
+        await self._timed(channel, callback, args, kwargs, True)
+    
+    def _record(self, channel, callback, seconds):
+        ms = seconds * 1000
+        key = (channel, _handler_name(callback))
+        if key not in self._handlers:
+            self._handlers[key] = _Histogram(len(self.BUCKETS) + 1)
+            # the channel entry may be gone, if `reset` is called while the
+            # channel is dispatching. `snapshot` expects both.
+            self._channels.setdefault(channel, [0, 0.0])
+        self._handlers[key].add(bisect_left(self.BUCKETS, ms), ms)
+        if ms > self.slow_threshold:
+            self.slow_reports.append({
+                'time': time(),
+                'channel': self._bus.get_label(channel),
+                'handler': key[1],
+                'ms': round(ms, 3),
+            })
+    
+    # -------------------------------------------------------------------------
+    
+    def reset(self):
+        # replace (not clear) the dicts, an in-flight dispatch keeps updating
+        # its counter in the old one.
+        self.slow_reports.clear()
+        self._channels = {}
+        self._handlers = {}
+        self._since = time()
+    
+    def snapshot(self) -> dict:
+        """
+        returns: dict
+            {
+                'since': float timestamp,
+                'buckets': [float ms, ...],
+                'channels': {
+                    str label: {
+                        'emits': int,
+                        'subscribers': int,
+                        'total_ms': float,
+                        'handlers': {
+                            str handler: {
+                                'calls': int,
+                                'total_ms': float,
+                                'max_ms': float,
+                                'histogram': [int, ...],
+                            }, ...
+                        }
+                    }, ...
+                },
+                'slow': [
+                    {'time': float, 'channel': str, 'handler': str,
+                     'ms': float}, ...
+                ],
+            }
+        """
+        channels = {}
+        for channel, (emits, total_ms) in self._channels.items():
+            channels[channel] = {
+                'emits': emits,
+                'subscribers': self._bus.count_subscribers(channel),
+                'total_ms': round(total_ms, 3),
+                'handlers': {},
+            }
+        for (channel, handler), hist in self._handlers.items():
+            channels[channel]['handlers'][handler] = hist.to_dict()
+        return {
+            'since': self._since,
+            'buckets': list(self.BUCKETS),
+            'channels': {
+                self._bus.get_label(k): v for k, v in channels.items()
+            },
+            'slow': list(self.slow_reports),
+        }
+    
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+    
+    def top(self, n=10) -> list:
+        """
+        returns: list[tuple[str label, int emits, float total_ms]]
+            the n most time-consuming channels.
+        """
+        return sorted(
+            (
+                (self._bus.get_label(k), emits, total_ms)
+                for k, (emits, total_ms) in self._channels.items()
+            ),
+            key=lambda x: x[2], reverse=True
+        )[:n]
+
+
+class _Histogram:
+    __slots__ = ('calls', 'counts', 'max_ms', 'total_ms')
+    
+    def __init__(self, size):
+        self.calls = 0
+        self.counts = [0] * size
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+    
+    def add(self, bucket, ms):
+        self.calls += 1
+        self.counts[bucket] += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+    
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': list(self.counts),
+        }
+
+
+def _handler_name(callback) -> str:
+    while isinstance(callback, partial):
+        # `_Offload` resolves to `partial(_Offload._run, callback)`, the real
+        # callback is the first arg.
+        if isinstance(getattr(callback.func, '__self__', None), _Offload):
+            callback = callback.args[0]
+        else:
+            callback = callback.func
+    return getattr(callback, '__qualname__', None) or repr(callback)
@@ -0,0 +1,158 @@
+"""
+an incremental trigram index over `LogStore` entries, for `Logger.search`.
+
+entries are grouped into blocks of `block_size` ids. for every trigram
+(lowercased), the index keeps the ascending list of blocks that contain it.
+a query is split into trigrams, the blocks containing all of them are the
+candidates, only the entries of candidate blocks are read and matched. so a
+search over a 1M-line log reads a few blocks, not the whole log.
+
+queries shorter than 3 characters (or regex patterns without a literal run
+of 3+ characters) can't be narrowed down, they scan all blocks.
+
+the index is built as entries arrive (`add`), it never re-indexes old
+entries.
+"""
+import re
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+
+try:
+    import re._parser as _sre_parse  # py3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+__all__ = ['SearchIndex']
+
+
+class SearchIndex:
+    
+    def __init__(self, block_size=256):
+        self.block_size = block_size
+        self.end = 0  # the id of the next entry to index.
+        self._block = -1  # the block being indexed.
+        self._block_grams = set()  # set[str]. trigrams seen in `_block`.
+        self._postings = {}  # dict[str trigram, array[int block]]
+    
+    def add(self, entry_id: int, text: str):
+        """ ids must be added in ascending order. """
+        block = entry_id // self.block_size
+        if block != self._block:
+            self._block = block
+            self._block_grams = set()
+        # log lines are repetitive, most trigrams were already seen in this
+        # block.
+        if grams := _trigrams(text.lower()) - self._block_grams:
+            self._block_grams |= grams
+            postings = self._postings
+            for gram in grams:
+                if (blocks := postings.get(gram)) is None:
+                    postings[gram] = array('I', (block,))
+                else:
+                    blocks.append(block)
+        self.end = entry_id + 1
+    
+    def clear(self):
+        self.end = 0
+        self._block = -1
+        self._block_grams = set()
+        self._postings.clear()
+    
+    def search(self, store, query: str, start: int, backward=False,
+               regex=False, ignore_case=True):
+        """
+        args:
+            store: LogStore
+            start: int. the entry id to start from (inclusive).
+            backward: bool. search towards older entries.
+        returns: optional[int]. the id of the first matched entry.
+        """
+        if regex:
+            match = re.compile(
+                query, re.IGNORECASE if ignore_case else 0
+            ).search
+            literals = _regex_literals(query)
+        else:
+            if ignore_case:
+                query = query.lower()
+                match = lambda s: query in s.lower()
+            else:
+                match = lambda s: query in s
+            literals = (query,)
+        
+        first = store.start // self.block_size
+        last = (max(store.end, self.end) - 1) // self.block_size
+        if last < first:
+            return None
+        blocks = self._candidates(literals)
+        if blocks is None:
+            blocks = range(first, last + 1)
+        # the tail which is not indexed yet is always a candidate.
+        blocks = sorted(set(blocks) | set(
+            range(self.end // self.block_size, last + 1)
+        ))
+        
+        size = self.block_size
+        start_block = start // size
+        if backward:
+            i = bisect_right(blocks, start_block)
+            for block in reversed(blocks[:i]):
+                if block < first:
+                    break
+                lo = block * size
+                entries = store.get_range(lo, min(lo + size, start + 1))
+                for k in range(len(entries) - 1, -1, -1):
+                    if match(str(entries[k])):
+                        return max(lo, store.start) + k
+        else:
+            i = bisect_left(blocks, max(start_block, first))
+            for block in blocks[i:]:
+                lo = max(block * size, start, store.start)
+                entries = store.get_range(lo, (block + 1) * size)
+                for k, entry in enumerate(entries):
+                    if match(str(entry)):
+                        return lo + k
+        return None
+    
+    def _candidates(self, literals):
+        """
+        returns: optional[set[int block]]. None means no restriction.
+        """
+        out = None
+        for literal in literals:
+            for gram in _trigrams(literal.lower()):
+                blocks = self._postings.get(gram, ())
+                out = set(blocks) if out is None else out.intersection(blocks)
+                if not out:
+                    return out
+        return out
+
+
+def _trigrams(text: str) -> set:
+    return set(map(''.join, zip(text, text[1:], text[2:])))
+
+
+def _regex_literals(pattern: str) -> tuple:
+    """
+    the literal runs (3+ chars) that every match must contain. only the top
+    level sequence of the pattern is inspected, which covers the common
+    cases like 'error: .* not found'.
+    
+    returns: tuple[str, ...]. empty if nothing is required.
+    """
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return ()
+    out, run = [], []
+    for op, arg in parsed:
+        if op is _sre_parse.LITERAL:
+            run.append(chr(arg))
+            continue
+        if len(run) >= 3:
+            out.append(''.join(run))
+        run = []
+    if len(run) >= 3:
+        out.append(''.join(run))
+    return tuple(out)
@@ -0,0 +1,199 @@
+"""
+stream log entries to a file from a background thread.
+
+usage:
+    Logger(sink='./log/app.log')
+    Logger(sink=FileSink('./log/app.log', max_bytes=1 << 20, compress=True))
+
+rotation:
+    when the file exceeds `max_bytes`, or is older than `max_age` seconds,
+    it's renamed to 'app.log.1' ('app.log.1.gz' if `compress`), the previous
+    'app.log.1' becomes 'app.log.2', and so on. at most `backups` rotated
+    files are kept.
+
+the writer flushes every `flush_interval` seconds (and when its buffer is
+full), so a crash loses at most the last buffer. `close` writes what's left
+and waits at most `timeout` seconds, it's also called at exit.
+
+an entry that fails to format (or a failed write or rotation) is reported to
+the loop's exception handler (or printed to stderr if there is no loop), the
+writer goes on with the next entry.
+"""
+import atexit
+import gzip
+import os
+import shutil
+import traceback
+from asyncio import get_running_loop
+from queue import Empty
+from queue import SimpleQueue
+from threading import Thread
+from time import time
+
+from rich.errors import MarkupError
+from rich.text import Text
+
+__all__ = ['FileSink']
+
+_STOP = object()
+
+
+class FileSink:
+    
+    def __init__(self, path: str, max_bytes=10 << 20, max_age=None,
+                 backups=5, compress=False, buffer_size=64 << 10,
+                 flush_interval=1.0, plain=True):
+        """
+        args:
+            max_bytes: optional[int]. None means no size-based rotation.
+            max_age: optional[float]. seconds. None means no time-based
+                rotation.
+            backups: int. how many rotated files to keep.
+            compress: bool. gzip rotated files (in the writer thread).
+            plain: bool. strip rich markup from entries (in the writer
+                thread).
+        """
+        self.path = path
+        self._backups = backups
+        self._buffer_size = buffer_size
+        self._closed = False
+        self._compress = compress
+        self._flush_interval = flush_interval
+        try:
+            self._loop = get_running_loop()  # for reporting errors.
+        except RuntimeError:
+            self._loop = None
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+        self._plain = plain
+        self._queue = SimpleQueue()  # SimpleQueue[union[str, _STOP]]
+        if folder := os.path.dirname(path):
+            os.makedirs(folder, exist_ok=True)
+        self._thread = Thread(
+            target=self._run, name='FileSink', daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def write(self, entry):
+        """
+        thread-safe, doesn't block. the entry is converted to str in the
+        writer thread.
+        """
+        if not self._closed:
+            self._queue.put(entry)
+    
+    def close(self, timeout=2.0):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+    
+    # -------------------------------------------------------------------------
+    # writer thread
+    
+    def _run(self):
+        try:
+            file, size, opened_at = self._open()
+        except Exception as e:
+            # nothing can be written, stop accepting entries.
+            self._closed = True
+            self._report(e)
+            return
+        get = self._queue.get
+        interval = self._flush_interval
+        last_flush = time()
+        while True:
+            try:
+                entry = get(timeout=interval)
+            except Empty:
+                last_flush = self._flush(file)
+                continue
+            if entry is _STOP:
+                break
+            try:
+                text = str(entry)
+                data = (_strip_markup(text) if self._plain else text) + '\n'
+                file.write(data)
+            except Exception as e:
+                self._report(e)
+                continue
+            size += len(data)
+            # a steady trickle never lets `get` time out, flush by time too.
+            if time() - last_flush >= interval:
+                last_flush = self._flush(file)
+            if (
+                    (self._max_bytes and size >= self._max_bytes) or
+                    (self._max_age and time() - opened_at >= self._max_age)
+            ):
+                try:
+                    file.close()
+                    self._rotate()
+                except Exception as e:
+                    self._report(e)
+                try:
+                    file, size, opened_at = self._open()
+                except Exception as e:
+                    self._closed = True
+                    self._report(e)
+                    return
+        file.close()
+    
+    def _flush(self, file) -> float:
+        """ returns: the time of this flush. """
+        try:
+            file.flush()
+        except Exception as e:
+            self._report(e)
+        return time()
+    
+    def _report(self, e):
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(loop.call_exception_handler, {
+                    'message': 'exception in log sink',
+                    'exception': e,
+                })
+                return
+            except RuntimeError:  # the loop is closed.
+                pass
+        traceback.print_exception(type(e), e, e.__traceback__)
+    
+    def _open(self):
+        """
+        returns: tuple[file, int size, float opened_at]
+            note `size` is counted in characters, which is close enough to
+            bytes for rotation.
+        """
+        file = open(
+            self.path, 'a', encoding='utf-8', buffering=self._buffer_size
+        )
+        return file, file.tell(), time()
+    
+    def _rotate(self):
+        ext = '.gz' if self._compress else ''
+        name = '{}.{{}}{}'.format(self.path, ext)
+        if os.path.exists(oldest := name.format(self._backups)):
+            os.remove(oldest)
+        for i in range(self._backups - 1, 0, -1):
+            if os.path.exists(src := name.format(i)):
+                os.replace(src, name.format(i + 1))
+        if self._backups <= 0:
+            os.remove(self.path)
+        elif self._compress:
+            with open(self.path, 'rb') as fi, \
+                    gzip.open(name.format(1), 'wb') as fo:
+                shutil.copyfileobj(fi, fo)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, name.format(1))
+
+
+def _strip_markup(entry: str) -> str:
+    try:
+        return Text.from_markup(entry).plain
+    except MarkupError:
+        return entry
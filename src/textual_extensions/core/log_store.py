@@ -0,0 +1,224 @@
+"""
+bounded storage for `Logger`.
+
+the most recent `capacity` entries are kept in memory (a ring buffer). older
+entries are not dropped, they are streamed to segment files on disk:
+    <spill_dir>/000000.log
+    <spill_dir>/000001.log
+    ...
+a segment is rotated when it reaches `segment_lines` entries. if
+`max_segments` is set, the oldest segments are deleted (then their entries
+are gone for good).
+
+one entry is one line in a segment file. newlines inside an entry are
+escaped as '\\x1f' and restored when reading. entries can be any objects,
+they are converted to str only when spilled.
+
+every entry has an id, which is its sequence number since the store was
+created (or cleared). ids don't change when old entries are dropped, the
+valid ids are `range(store.start, store.end)`. `get_range` reads a window of
+entries by ids, segments keep the line offsets for random access.
+"""
+import os
+import shutil
+from array import array
+from collections import deque
+from itertools import islice
+from tempfile import mkdtemp
+from weakref import finalize
+
+__all__ = ['LogStore']
+
+
+class LogStore:
+    
+    def __init__(self, capacity=10000, spill=True, spill_dir=None,
+                 segment_lines=100_000, max_segments=None):
+        """
+        args:
+            capacity: int. how many entries are kept in memory.
+            spill: bool. write evicted entries to disk. if False, they are
+                dropped.
+            spill_dir: optional[str]. None means a temp dir, which is removed
+                when this store is garbage collected (or `close`d).
+            segment_lines: int. the max entries of a segment file.
+            max_segments: optional[int]. None means unlimited.
+        """
+        self.capacity = capacity
+        self._disk_count = 0  # the number of entries in segment files.
+        self._dropped = 0  # the number of entries gone for good.
+        self._memory = deque(maxlen=capacity)
+        self._segment = None  # optional[file]. the writing segment.
+        self._segments = deque()  # deque[_Segment]
+        self._spill = spill
+        self._spill_dir = spill_dir
+        self._segment_lines = segment_lines
+        self._max_segments = max_segments
+        self._finalizer = None
+    
+    def __len__(self):
+        """ O(1), counts both memory and disk. """
+        return self._disk_count + len(self._memory)
+    
+    def __bool__(self):
+        return bool(self._memory)
+    
+    def __iter__(self):
+        """
+        iterate all entries (disk then memory), from old to new. entries from
+        disk are str.
+        """
+        yield from self.iter_disk()
+        yield from tuple(self._memory)
+    
+    @property
+    def start(self) -> int:
+        """ the id of the oldest entry. """
+        return self._dropped
+    
+    @property
+    def end(self) -> int:
+        """ the id of the next entry. """
+        return self._dropped + len(self)
+    
+    def append(self, entry):
+        memory = self._memory
+        if len(memory) == self.capacity:
+            if self._spill:
+                self._write(memory[0])
+            else:
+                self._dropped += 1
+        memory.append(entry)
+    
+    def last(self):
+        """ returns: optional[entry] """
+        return self._memory[-1] if self._memory else None
+    
+    def tail(self, n: int) -> list:
+        """ returns: list[entry]. the last n entries in memory, old to new. """
+        out = list(islice(reversed(self._memory), n))
+        out.reverse()
+        return out
+    
+    def get_range(self, start: int, stop: int) -> list:
+        """
+        args:
+            start, stop: entry ids. they are clamped to the valid range.
+        returns: list[entry]. entries from disk are str.
+        """
+        start = max(start, self.start)
+        stop = min(stop, self.end)
+        out = []
+        if start >= stop:
+            return out
+        
+        memory_start = self.end - len(self._memory)
+        if start < memory_start:
+            if self._segment is not None:
+                self._segment.flush()
+            seg_start = self._dropped
+            for seg in tuple(self._segments):
+                seg_stop = seg_start + seg.count
+                if seg_stop > start and seg_start < stop:
+                    out.extend(seg.read(
+                        max(start - seg_start, 0),
+                        min(stop, seg_stop) - seg_start
+                    ))
+                if seg_stop >= stop:
+                    break
+                seg_start = seg_stop
+        
+        if stop > memory_start:
+            out.extend(islice(
+                self._memory,
+                max(start - memory_start, 0), stop - memory_start
+            ))
+        return out
+    
+    def iter_disk(self):
+        if self._segment is not None:
+            self._segment.flush()
+        for seg in tuple(self._segments):
+            with open(seg.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield line[:-1].replace('\x1f', '\n')
+    
+    def clear(self):
+        self._memory.clear()
+        self._close_segment()
+        for seg in self._segments:
+            os.remove(seg.path)
+        self._segments.clear()
+        self._disk_count = 0
+        self._dropped = 0
+    
+    def close(self):
+        """ close the writing segment, remove the temp dir if it's ours. """
+        self._close_segment()
+        if self._finalizer is not None:
+            self._finalizer()
+    
+    # -------------------------------------------------------------------------
+    
+    def _write(self, entry):
+        if self._segment is None:
+            self._open_segment()
+        data = (str(entry).replace('\n', '\x1f') + '\n').encode('utf-8')
+        seg = self._segments[-1]
+        seg.offsets.append(seg.size)
+        seg.size += len(data)
+        self._segment.write(data)
+        self._disk_count += 1
+        if seg.count >= self._segment_lines:
+            self._close_segment()
+    
+    def _open_segment(self):
+        if self._spill_dir is None:
+            self._spill_dir = mkdtemp(prefix='textual_extensions_log_')
+            self._finalizer = finalize(
+                self, shutil.rmtree, self._spill_dir, True
+            )
+        else:
+            os.makedirs(self._spill_dir, exist_ok=True)
+        if self._segments:
+            index = int(os.path.basename(self._segments[-1].path)[:-4]) + 1
+        else:
+            index = 0
+        path = os.path.join(self._spill_dir, '{:06d}.log'.format(index))
+        self._segment = open(path, 'wb')
+        self._segments.append(_Segment(path))
+        if self._max_segments and len(self._segments) > self._max_segments:
+            old = self._segments.popleft()
+            os.remove(old.path)
+            self._disk_count -= old.count
+            self._dropped += old.count
+    
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+
+class _Segment:
+    __slots__ = ('offsets', 'path', 'size')
+    
+    def __init__(self, path):
+        self.offsets = array('Q')  # the byte offset of each line.
+        self.path = path
+        self.size = 0
+    
+    @property
+    def count(self):
+        return len(self.offsets)
+    
+    def read(self, start, stop) -> list:
+        """ read lines [start, stop) of this segment. """
+        begin = self.offsets[start]
+        end = self.offsets[stop] if stop < len(self.offsets) else self.size
+        with open(self.path, 'rb') as f:
+            f.seek(begin)
+            data = f.read(end - begin)
+        return [
+            line.replace('\x1f', '\n')
+            for line in data.decode('utf-8').split('\n')[:-1]
+        ]
@@ -1,27 +1,56 @@
+from asyncio import get_running_loop
 from inspect import currentframe
 from os import getcwd
+from os import makedirs
+from os.path import dirname
 from os.path import relpath
+from time import strftime
+from time import time
 from typing import Optional
 
 from rich.panel import Panel
 from textual import log as _log
 from textual.widget import Widget
 
-__all__ = ['Logger', 'log', 'logf']
+from .log_index import SearchIndex
+from .log_sink import FileSink
+from .log_store import LogStore
 
-# log to file
-logf = _log
+__all__ = ['LogRecord', 'Logger', 'log', 'logf', 'set_logf_level']
+
+_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+_LEVEL_MARKUPS = {
+    10: '[dim]DEBUG[/] ',
+    20: '',
+    30: '[yellow]WARNING[/] ',
+    40: '[red]ERROR[/] ',
+}
+_logf_level = 10
+
+
+def logf(*args, level='info', **kwargs):
+    """ log to file (textual's log file, see `App(log=...)`). """
+    if _LEVELS[level] >= _logf_level:
+        _log(*args, **kwargs)
+
+
+def set_logf_level(level: str):
+    """ args: level: 'debug' | 'info' | 'warning' | 'error' """
+    global _logf_level
+    _logf_level = _LEVELS[level]
 
 
-# TODO: make this widget scrollable
 class Logger(Widget):
-    _cache: list
+    _cache: LogStore
     _content_height: int = 2
+    _scroll_step: int = 3
     # _message: str = ''
     # _source_pos: str = ''
     _working_dir: str = getcwd()
     
-    def __init__(self, content_height=1, debug=False):
+    def __init__(self, content_height=1, debug=False, capacity=10000,
+                 spill_dir=None, fps=30, sink=None, searchable=True,
+                 level='debug', sources=()):
         """
         we suggust Logger's height to be `content_height + 2` -- the two is for
         its border size.
@@ -33,60 +62,314 @@ class Logger(Widget):
                         edge='bottom',  #                   |
                         size=3  # <- content_height + 2  <--+
                     )
+        
+        args:
+            capacity: int. the max entries kept in memory, older ones are
+                moved to disk. see `LogStore`.
+            spill_dir: optional[str]. where to put the older entries. None
+                means a temp dir.
+            fps: int. the max repaints per second. `log` only appends and
+                marks the widget dirty, a scheduled flush repaints once for
+                all messages in the same frame.
+            sink: optional[str | FileSink]. stream every message to a file
+                in the background. a str is the file path. note with a sink,
+                messages are formatted when they are logged.
+            searchable: bool. index entries for `search`. the index is
+                updated lazily by `search`, logging doesn't format records
+                for it.
+            level, sources: see `set_filter`.
+        
+        scrolling:
+            mouse wheel, up, down, pageup, pagedown, home, end. the view
+            follows new entries unless it's scrolled up, `end` goes back to
+            following.
         """
         super().__init__()
         self.debug = debug
-        self._cache = []
+        self.level = _LEVELS[level]
+        self.sources = tuple(sources)
+        self._cache = LogStore(capacity, spill_dir=spill_dir)
         self._content_height = content_height
+        self._dirty = False  # True if a flush is scheduled.
+        self._frame_time = 1 / fps
+        self._last_flush = 0.0
+        self._index = SearchIndex() if searchable else None
+        self._match = None  # optional[int]. the id of the current match.
+        self._sink = FileSink(sink) if isinstance(sink, str) else sink
+        self._top = None
+        #   optional[int]. the id of the first visible entry. None means
+        #   following the tail.
         global _logger
         _logger = self
     
     def render(self):
+        # only the visible window is read from the store (which may be on
+        # disk) and formatted.
+        store = self._cache
+        if self._top is None:
+            lines = store.tail(self._content_height)
+            first = store.end - len(lines)
+            title = f'Logger ({len(store)})'
+        else:
+            first = self._top = max(self._top, store.start)
+            lines = store.get_range(first, first + self._content_height)
+            title = 'Logger ({}-{}/{})'.format(
+                first - store.start + 1,
+                first - store.start + len(lines), len(store)
+            )
+        lines = list(map(str, lines))
+        if self._match is not None and 0 <= self._match - first < len(lines):
+            i = self._match - first
+            lines[i] = f'[reverse]{lines[i]}[/reverse]'
         return Panel(
-            '\n'.join(self._cache[-self._content_height:]),
-            title=f'Logger ({len(self._cache)})', title_align='right',
+            '\n'.join(lines),
+            title=title, title_align='right',
             border_style='dim',
         
         )
     
-    def log(self, *args, frame=None):
-        message = '; '.join(map(str, args)).strip('; ')
-        if not self.debug:
-            if self._cache and message == self._cache[-1]:
-                return
-            else:
-                self._cache.append(message)
-        else:
+    def log(self, *args, frame=None, level='info'):
+        # filters go first, a filtered out record costs a dict lookup and a
+        # comparison. the args are formatted only when the record is
+        # displayed or written.
+        if (levelno := _LEVELS[level]) < self.level:
+            return
+        source = None
+        if self.debug or self.sources:
             if not frame:
                 frame = currentframe().f_back.f_back
-            file_abs = frame.f_globals.get('__file__') \
-                       or frame.f_code.co_filename
-            file_rel = relpath(file_abs, self._working_dir)
-            line = frame.f_lineno
-            source_pos = f'{file_rel}:{line}'
-            
-            message = f'[blue]{source_pos}[/] [dim]>>[/] {message}'
-            if self._cache and message == self._cache[-1]:
+            source = _source_pos(frame)
+            if self.sources and not source.startswith(self.sources):
                 return
-            else:
-                self._cache.append(message)
+        record = LogRecord(
+            levelno, time(), source if self.debug else None, args
+        )
+        if record == self._cache.last():
+            return
+        self._cache.append(record)
+        if self._sink is not None:
+            # the args may be live objects which the loop keeps changing, the
+            # sink thread gets a snapshot.
+            self._sink.write(str(record))
+        self._schedule_flush()
+    
+    def set_filter(self, level=None, sources=None):
+        """
+        args:
+            level: optional[str]. 'debug' | 'info' | 'warning' | 'error'. the
+                records below this level are dropped.
+            sources: optional[tuple[str, ...]]. the relative paths (or path
+                prefixes) of source files to accept. an empty tuple accepts
+                all.
+        """
+        if level is not None:
+            self.level = _LEVELS[level]
+        if sources is not None:
+            self.sources = tuple(sources)
+    
+    def _schedule_flush(self):
+        if self._dirty:
+            return
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            # the app is not running yet, the first render shows them.
+            return
+        self._dirty = True
+        loop.call_later(
+            max(self._last_flush + self._frame_time - loop.time(), 0),
+            self._flush, loop
+        )
+    
+    def _flush(self, loop):
+        self._dirty = False
+        self._last_flush = loop.time()
+        # the title counter and the tail are both read in `render`, so they
+        # are always updated together.
+        self.refresh()
+    
+    def _update_index(self):
+        index, store = self._index, self._cache
+        if index is None or index.end >= store.end:
+            return
+        start = max(index.end, store.start)
+        for i, entry in enumerate(store.get_range(start, store.end), start):
+            index.add(i, str(entry))
+    
+    # -------------------------------------------------------------------------
+    # scroll and search
+    
+    async def on_key(self, event):
+        page = max(self._content_height - 1, 1)
+        if event.key == 'up':
+            self.scroll_by(-1)
+        elif event.key == 'down':
+            self.scroll_by(1)
+        elif event.key == 'pageup':
+            self.scroll_by(-page)
+        elif event.key == 'pagedown':
+            self.scroll_by(page)
+        elif event.key == 'home':
+            self.scroll_to(self._cache.start)
+        elif event.key == 'end':
+            self.scroll_to(None)
+    
+    async def on_mouse_scroll_up(self, _):
+        # note: in textual, mouse scroll up means moving the content up.
+        #   see also `widgets/listbox2.py:ListBox.on_mouse_scroll_up`.
+        self.scroll_by(self._scroll_step)
+    
+    async def on_mouse_scroll_down(self, _):
+        self.scroll_by(-self._scroll_step)
+    
+    def scroll_by(self, lines: int):
+        store = self._cache
+        if self._top is None:
+            top = store.end - self._content_height
+        else:
+            top = self._top
+        self.scroll_to(top + lines)
+    
+    def scroll_to(self, entry_id):
+        """
+        args:
+            entry_id: optional[int]. the id of the first visible entry. None
+                means following the tail.
+        """
+        store = self._cache
+        if entry_id is None or entry_id >= store.end - self._content_height:
+            self._top = None
+        else:
+            self._top = max(entry_id, store.start)
         self.refresh()
     
+    def search(self, query: str, backward=False, regex=False,
+               ignore_case=True) -> bool:
+        """
+        jump to the next match after the current match (or from the top of
+        the view), and highlight it. call it repeatedly to go through all
+        matches.
+        
+        returns: bool. False if nothing matched, the view is not changed.
+        """
+        if self._index is None:
+            raise Exception(
+                'Logger is not searchable, create it with `searchable=True`.'
+            )
+        self._update_index()
+        store = self._cache
+        if self._match is not None:
+            start = self._match + (-1 if backward else 1)
+        elif self._top is None:
+            start = store.end - 1 if backward else store.start
+        else:
+            start = self._top
+        found = self._index.search(
+            store, query, start, backward, regex, ignore_case
+        )
+        if found is None:
+            return False
+        self._match = found
+        self.scroll_to(found - self._content_height // 2)
+        return True
+    
+    def clear_search(self):
+        self._match = None
+        self.refresh()
+    
+    # -------------------------------------------------------------------------
+    
+    async def close_messages(self):
+        # the app closes all widgets on shutdown.
+        await super().close_messages()
+        if self._sink is not None:
+            self._sink.close()
+    
     def dump(self, file=''):
+        """
+        dump the whole history at once. prefer the `sink` argument for long
+        running sessions.
+        """
         if self._cache:
-            from lk_utils import dumps
-            from lk_utils.time_utils import timestamp
-            dumps('\n'.join(self._cache),
-                  file or './log/{}.log'.format(timestamp('ymd-hns')))
+            file = file or './log/{}.log'.format(strftime('%Y%m%d-%H%M%S'))
+            if folder := dirname(file):
+                makedirs(folder, exist_ok=True)
+            # stream entries, don't join the whole history in memory.
+            with open(file, 'w', encoding='utf-8') as f:
+                for i, line in enumerate(self._cache):
+                    if i:
+                        f.write('\n')
+                    f.write(str(line))
+
+
+class LogRecord:
+    """
+    a structured log record. it keeps the raw args, `str` formats them only
+    when the record is displayed or written.
+    """
+    __slots__ = ('args', 'level', 'source', 'time')
+    __hash__ = None
+    
+    def __init__(self, level: int, time_: float, source, args: tuple):
+        """
+        args:
+            source: optional[str]. 'file_rel:lineno', only in debug mode.
+        """
+        self.args = args
+        self.level = level
+        self.source = source
+        self.time = time_
+    
+    def __eq__(self, other):
+        if not isinstance(other, LogRecord):
+            return False
+        try:
+            return (
+                self.level == other.level and
+                self.source == other.source and
+                bool(self.args == other.args)
+            )
+        except Exception:  # e.g. comparing numpy arrays.
+            return False
+    
+    def __str__(self):
+        message = _LEVEL_MARKUPS[self.level] + \
+                  '; '.join(map(str, self.args)).strip('; ')
+        if self.source is None:
+            return message
+        return f'[blue]{self.source}[/] [dim]>>[/] {message}'
+
+
+_positions = {}  # dict[tuple[code, int lineno], str 'file_rel:lineno']
+_relpaths = {}  # dict[code, str file_rel]
+
+
+def _source_pos(frame) -> str:
+    """
+    the relpath is computed once per code object, the position string once
+    per line.
+    """
+    code = frame.f_code
+    key = (code, frame.f_lineno)
+    if (pos := _positions.get(key)) is None:
+        if (file_rel := _relpaths.get(code)) is None:
+            file_abs = frame.f_globals.get('__file__') or code.co_filename
+            file_rel = _relpaths[code] = relpath(
+                file_abs, Logger._working_dir
+            )
+        pos = _positions[key] = f'{file_rel}:{frame.f_lineno}'
+    return pos
 
 
 _logger = None  # type: Optional[Logger]
 
 
-def log(*args):
+def log(*args, level='info'):
     if _logger is None:
         raise Exception(
             'Logger is not initialized, you should add Logger widget to your '
             'App.on_mount(), and call this function only in the runtime.'
         )
-    _logger.log(*args, frame=currentframe().f_back)
+    if _LEVELS[level] < _logger.level:
+        return
+    _logger.log(*args, frame=currentframe().f_back, level=level)
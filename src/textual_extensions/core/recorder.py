@@ -0,0 +1,429 @@
+"""
+record and replay event streams, for reproducible performance runs.
+
+usage:
+    # record: attach a recorder to the app (in `on_mount` for example).
+    from textual_extensions import Recorder
+    class MyApp(App):
+        async def on_mount(self):
+            self.recorder = Recorder('./session.trace').attach(self)
+            ...
+        async def on_shutdown_request(self, event):
+            self.recorder.detach()
+    
+    # replay: as fast as possible (speed=None) or at original speed (1.0)
+    # against a headless app. stdout can be redirected to /dev/null.
+    from textual_extensions.core.recorder import run_headless
+    elapsed = run_headless(MyApp, './session.trace', speed=None)
+    
+    # scrub a large trace without loading it.
+    reader = TraceReader('./session.trace')
+    for record in reader.iter_from(reader.find(60.0)):  # from 60s on.
+        ...
+
+what is recorded:
+    - every input event (key, mouse move/down/up, click, scroll) that the
+      app receives from the terminal driver. they are the source of all
+      events that reach `textual_extensions` widgets, and replaying them at
+      the app level reproduces the same routing (focus, hover, etc.).
+    - every signal emit (channel label + args if picklable). they are for
+      analysis, replay only re-emits global signals if asked (other signals
+      are results of input events, re-emitting them would fire twice).
+
+file format (little endian):
+    magic       b'TXTR\\x01'
+    records     [header payload]...
+        header  struct '<dBI': float time (seconds since the trace started),
+                u8 kind (0: input, 1: signal), u32 payload size.
+        payload input: u8 event code + struct of event fields.
+                signal: u16 label size + label (utf-8) + pickled (args,
+                kwargs) or empty.
+the file is append-only. a new recording on an existing file continues its
+timeline.
+"""
+import asyncio
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from time import monotonic
+from time import perf_counter
+
+from textual import events
+from textual.driver import Driver
+from textual.geometry import Size
+
+from .event_engine import event_bus
+
+__all__ = ['Recorder', 'TraceReader', 'replay', 'wait_idle']
+
+MAGIC = b'TXTR\x01'
+KIND_INPUT = 0
+KIND_SIGNAL = 1
+
+_HEADER = struct.Struct('<dBI')
+_MOUSE = struct.Struct('<hhhhB???hh')
+#   x, y, delta_x, delta_y, button, shift, meta, ctrl, screen_x, screen_y
+_SCROLL = struct.Struct('<hh')
+_LABEL = struct.Struct('<H')
+
+_EVENT_TYPES = (
+    events.Key,
+    events.MouseMove,
+    events.MouseDown,
+    events.MouseUp,
+    events.Click,
+    events.DoubleClick,
+    events.MouseScrollUp,
+    events.MouseScrollDown,
+)  # the index is the event code. only append new types to the tail!
+_EVENT_CODES = {t: i for i, t in enumerate(_EVENT_TYPES)}
+
+Record = namedtuple('Record', 'time kind payload')
+
+
+# -----------------------------------------------------------------------------
+# encoding
+
+def encode_event(event) -> bytes:
+    """ returns: empty bytes if the event type is not recordable. """
+    if (code := _EVENT_CODES.get(type(event))) is None:
+        return b''
+    if isinstance(event, events.Key):
+        return bytes((code,)) + event.key.encode('utf-8')
+    if isinstance(event, events.MouseScrollDown):
+        return bytes((code,)) + _SCROLL.pack(event.x, event.y)
+    return bytes((code,)) + _MOUSE.pack(
+        event.x, event.y, event.delta_x, event.delta_y, event.button,
+        event.shift, event.meta, event.ctrl,
+        event.x if event.screen_x is None else event.screen_x,
+        event.y if event.screen_y is None else event.screen_y,
+    )
+
+
+def decode_event(payload: bytes, sender):
+    cls = _EVENT_TYPES[payload[0]]
+    body = payload[1:]
+    if cls is events.Key:
+        return cls(sender, body.decode('utf-8'))
+    if issubclass(cls, events.MouseScrollDown):
+        return cls(sender, *_SCROLL.unpack(body))
+    return cls(sender, *_MOUSE.unpack(body))
+
+
+def encode_signal(label: str, data=b'') -> bytes:
+    """
+    args:
+        data: bytes. the pickled (args, kwargs), see `pickle_args`. empty
+            means args are not recorded.
+    """
+    raw = label.encode('utf-8')
+    return _LABEL.pack(len(raw)) + raw + data
+
+
+def pickle_args(args, kwargs):
+    """ returns: optional[bytes]. None if not picklable. """
+    try:
+        return pickle.dumps((args, kwargs), pickle.HIGHEST_PROTOCOL)
+    except Exception:  # widgets, locks, lambdas... are not picklable.
+        return None
+
+
+def decode_signal(payload: bytes):
+    """
+    returns: tuple[str label, optional[tuple[tuple args, dict kwargs]]]
+        the second item is None if args were not recorded.
+    """
+    size, = _LABEL.unpack_from(payload)
+    label = payload[2:2 + size].decode('utf-8')
+    data = payload[2 + size:]
+    return label, (pickle.loads(data) if data else None)
+
+
+# -----------------------------------------------------------------------------
+# file io
+
+class TraceWriter:
+    
+    def __init__(self, path: str, buffer_size=64 * 1024):
+        if os.path.exists(path) and os.path.getsize(path):
+            # continue the timeline of the existing trace.
+            with TraceReader(path) as reader:
+                self._offset = reader.duration
+        else:
+            self._offset = 0.0
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+        self._file = open(path, 'ab', buffering=buffer_size)
+        self._start = monotonic()
+    
+    def write(self, kind: int, payload: bytes):
+        t = self._offset + monotonic() - self._start
+        self._file.write(_HEADER.pack(t, kind, len(payload)))
+        self._file.write(payload)
+    
+    def flush(self):
+        self._file.flush()
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class TraceReader:
+    """
+    a memory-mapped reader. opening a trace only maps it, the record index
+    (offsets and times, not payloads) is built on first use by scanning the
+    headers.
+    """
+    
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError('not a trace file: {}'.format(path))
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('not a trace file: {}'.format(path))
+        self._offsets = None  # optional[array[int]]. payload offsets.
+        self._times = None  # optional[array[float]]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *_):
+        self.close()
+    
+    def __len__(self):
+        self._build_index()
+        return len(self._offsets)
+    
+    def __getitem__(self, index: int) -> Record:
+        self._build_index()
+        offset = self._offsets[index]
+        t, kind, size = _HEADER.unpack_from(self._mm, offset - _HEADER.size)
+        return Record(t, kind, self._mm[offset:offset + size])
+    
+    def __iter__(self):
+        return self.iter_from(0)
+    
+    @property
+    def duration(self) -> float:
+        self._build_index()
+        return self._times[-1] if self._times else 0.0
+    
+    def find(self, time: float) -> int:
+        """ returns: the index of the first record at or after `time`. """
+        self._build_index()
+        return bisect_left(self._times, time)
+    
+    def iter_from(self, index: int):
+        for i in range(index, len(self)):
+            yield self[i]
+    
+    def close(self):
+        self._mm.close()
+        self._file.close()
+    
+    def _build_index(self):
+        if self._offsets is not None:
+            return
+        offsets, times = array('Q'), array('d')
+        mm, pos, end = self._mm, len(MAGIC), len(self._mm)
+        while pos + _HEADER.size <= end:
+            t, _, size = _HEADER.unpack_from(mm, pos)
+            pos += _HEADER.size
+            if pos + size > end:
+                break  # a truncated tail (e.g. the app crashed).
+            offsets.append(pos)
+            times.append(t)
+            pos += size
+        self._offsets, self._times = offsets, times
+
+
+# -----------------------------------------------------------------------------
+# record
+
+class Recorder:
+    
+    def __init__(self, path: str, bus=event_bus, signal_args=True):
+        """
+        args:
+            signal_args: bool[True]
+                record signal args (if picklable). a channel whose args fail
+                to pickle once is not tried again.
+        """
+        self._app = None
+        self._bus = bus
+        self._signal_args = signal_args
+        self._unpicklable = set()  # set[channel]
+        self._writer = TraceWriter(path)
+    
+    def attach(self, app=None) -> 'Recorder':
+        """
+        start recording signal emits, and input events of `app` (if given).
+        """
+        # shadow the class-level methods by instance attributes, `detach`
+        # deletes them.
+        self._bus.broadcast = self._broadcast
+        if app is not None:
+            self._app = app
+            app.on_event = self._on_event
+        return self
+    
+    def detach(self):
+        self._bus.__dict__.pop('broadcast', None)
+        if self._app is not None:
+            self._app.__dict__.pop('on_event', None)
+            self._app = None
+        self._writer.close()
+    
+    async def _broadcast(self, channel, *args, **kwargs):
+        data = None
+        if self._signal_args and channel not in self._unpicklable:
+            if (data := pickle_args(args, kwargs)) is None:
+                self._unpicklable.add(channel)
+        self._writer.write(KIND_SIGNAL, encode_signal(
+            self._bus.get_label(channel), data or b''
+        ))
+        await type(self._bus).broadcast(self._bus, channel, *args, **kwargs)
+    
+    async def _on_event(self, event):
+        if isinstance(event, events.InputEvent) and not event.is_forwarded:
+            if payload := encode_event(event):
+                self._writer.write(KIND_INPUT, payload)
+        await type(self._app).on_event(self._app, event)
+
+
+# -----------------------------------------------------------------------------
+# replay
+
+async def replay(app, path: str, speed=1.0, signals=False,
+                 drain_every=50, pause=0.02) -> int:
+    """
+    post the recorded input events to app, and wait until the app has
+    handled them (see `wait_idle`).
+    
+    args:
+        speed: optional[float]
+            None: as fast as possible. posting is much faster than handling,
+                so every `drain_every` events it waits for the app to catch
+                up, the queues don't pile up the whole trace.
+            float: 1.0 is the original speed, 2.0 is twice faster, etc.
+        pause: float. only for `speed=None`. a gap longer than this (seconds)
+            in the trace is replayed as a short idle time, so handlers that
+            depend on timing see the same bursts (e.g. `Input` tells a paste
+            from typing by speed).
+        signals: bool[False]
+            also re-emit recorded global signals (`listen`/`emit`) which
+            have args recorded.
+    returns: the number of replayed records.
+    """
+    count = 0
+    with TraceReader(path) as reader:
+        start = monotonic()
+        last = 0.0
+        for record in reader:
+            if speed:
+                delay = record.time / speed - (monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif record.time - last > pause:
+                await wait_idle(app)
+            else:
+                await asyncio.sleep(0)
+            last = record.time
+            if record.kind == KIND_INPUT:
+                await app.post_message(decode_event(record.payload, app))
+                count += 1
+                if not speed and count % drain_every == 0:
+                    await wait_idle(app, settle=0)
+            elif signals:
+                label, data = decode_signal(record.payload)
+                if data is not None and label.startswith('global#'):
+                    args, kwargs = data
+                    await event_bus.broadcast(label, *args, **kwargs)
+                    count += 1
+    await wait_idle(app)
+    return count
+
+
+async def wait_idle(app, settle=0.01, timeout=10.0) -> bool:
+    """
+    wait until the app and all its widgets have handled their messages, and
+    they stay idle for `settle` seconds (so short timers, e.g. the burst
+    window of `Input`, get their turn).
+    
+    returns: bool. False if timed out.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if _is_idle(app) and all(map(_is_idle, tuple(app.children))):
+            if not settle:
+                return True
+            await asyncio.sleep(settle)
+            if _is_idle(app) and all(map(_is_idle, tuple(app.children))):
+                return True
+        else:
+            await asyncio.sleep(0)
+    return False
+
+
+def _is_idle(pump) -> bool:
+    # note: textual (0.1.18) has no api for this, we check its internals. a
+    #   pump is idle when its queue is empty and it's waiting in
+    #   `get_message` (the queue has a pending getter). an empty queue
+    #   without a getter means a message is being handled.
+    if pump._closed or not pump._running:
+        return True
+    queue = pump._message_queue
+    return (
+        pump._pending_message is None and queue.empty() and
+        any(not f.done() for f in queue._getters)
+    )
+
+
+class HeadlessDriver(Driver):
+    """ a driver that doesn't touch the terminal. """
+    size = (80, 24)
+    
+    def start_application_mode(self):
+        self.send_event(events.Resize(self._target, Size(*self.size)))
+    
+    def disable_input(self):
+        pass
+    
+    def stop_application_mode(self):
+        pass
+
+
+def run_headless(app_cls, path: str, speed=None, size=(80, 24),
+                 mount_delay=0.2, **app_kwargs) -> float:
+    """
+    run `app_cls` with a headless driver, replay the trace against it, then
+    shutdown the app.
+    
+    note: the app still renders to stdout, redirect it if not needed.
+    
+    returns: the elapsed seconds of replaying, until the app has handled
+        all replayed events.
+    """
+    driver = type('HeadlessDriver', (HeadlessDriver,), {'size': size})
+    
+    async def main():
+        app = app_cls(driver_class=driver, **app_kwargs)
+        runner = asyncio.ensure_future(app.process_messages())
+        await asyncio.sleep(mount_delay)  # wait for `on_mount`.
+        start = perf_counter()
+        await replay(app, path, speed)
+        elapsed = perf_counter() - start
+        await app.shutdown()
+        await runner
+        return elapsed
+    
+    return asyncio.run(main())
@@ -3,7 +3,9 @@ extended (custom) widgets.
 """
 from .box_layout import HBox
 from .box_layout import VBox
+from .bus_monitor import BusMonitor
 from .button import Button
+from .completion import PrefixIndex
 from .dialog import Dialog
 from .empty_row import EmptyRow
 from .focus_scope import FocusScope
@@ -0,0 +1,63 @@
+"""
+a live overlay of event bus statistics.
+
+usage:
+    class MyApp(App):
+        async def on_mount(self):
+            await self.view.dock(BusMonitor(), edge='right', size=60, z=1)
+
+the monitor enables `event_bus.enable_stats()` on mount if it's not enabled
+yet.
+"""
+from rich.panel import Panel
+from rich.table import Table
+from textual.widget import Widget
+
+from ..core import event_bus
+
+__all__ = ['BusMonitor']
+
+
+class BusMonitor(Widget):
+    
+    def __init__(self, top=10, interval=1.0, slow_threshold=16.0):
+        """
+        args:
+            top: int. how many channels to show (sorted by total time).
+            interval: float. refresh interval in seconds.
+            slow_threshold: float. milliseconds. only used when this widget
+                enables the stats.
+        """
+        super().__init__()
+        self._interval = interval
+        self._slow_threshold = slow_threshold
+        self._top = top
+    
+    async def on_mount(self, _):
+        if event_bus.stats is None:
+            event_bus.enable_stats(slow_threshold=self._slow_threshold)
+        self.set_interval(self._interval, self.refresh)
+    
+    def render(self):
+        stats = event_bus.stats
+        if stats is None:
+            return Panel('[dim]stats disabled[/]', title='Event Bus')
+        
+        table = Table(expand=True, box=None, padding=(0, 1))
+        table.add_column('channel', overflow='ellipsis', no_wrap=True)
+        table.add_column('emits', justify='right')
+        table.add_column('total ms', justify='right')
+        for label, emits, total_ms in stats.top(self._top):
+            table.add_row(label, str(emits), '{:.1f}'.format(total_ms))
+        
+        if stats.slow_reports:
+            last = stats.slow_reports[-1]
+            table.add_row(
+                '[red]slow: {}[/]'.format(last['handler']),
+                '', '[red]{:.1f}[/]'.format(last['ms'])
+            )
+        
+        return Panel(
+            table, title='Event Bus ({})'.format(len(stats.slow_reports)),
+            title_align='right', border_style='dim',
+        )
@@ -0,0 +1,72 @@
+"""
+completion providers for `Input(completer=...)`.
+
+a completer is any callable that takes the current text (it's called only
+when the cursor is at the end) and returns the candidates (full strings,
+best first):
+    def my_completer(text: str) -> list: ...
+or an awaitable of them, for slow sources (files, network, databases):
+    async def my_completer(text: str) -> list: ...
+
+a sync completer runs on every keystroke in the loop thread, so it must be
+fast -- use `PrefixIndex` for static vocabularies. an async completer runs
+in a task, a new keystroke cancels the stale task, typing is never blocked.
+
+usage:
+    hosts = PrefixIndex(open('hosts.txt').read().splitlines())
+    Input(completer=hosts)
+"""
+from bisect import bisect_left
+
+__all__ = ['PrefixIndex']
+
+
+class PrefixIndex:
+    """
+    a sorted array of words, searched by bisect. it's built once (O(n log n)),
+    a lookup is O(log n + limit), e.g. ~10us in 500k paths.
+    """
+    
+    def __init__(self, words, limit=10, ignore_case=False):
+        """
+        args:
+            words: iterable[str]. duplicates are removed.
+            limit: int. the max candidates per lookup.
+            ignore_case: bool. match case-insensitively, the candidates keep
+                their own case.
+        """
+        self.limit = limit
+        self.ignore_case = ignore_case
+        if ignore_case:
+            pairs = sorted({(w.lower(), w) for w in words})
+            self._keys = [k for k, _ in pairs]  # list[str]. sorted.
+            self._words = [w for _, w in pairs]  # list[str]
+        else:
+            self._keys = self._words = sorted(set(words))
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __call__(self, text: str) -> list:
+        return self.complete(text)
+    
+    def complete(self, prefix: str, limit=None) -> list:
+        """
+        returns: list[str]. the words starting with `prefix`, in sorted
+            order. `prefix` itself is excluded.
+        """
+        if not prefix:
+            return []
+        if self.ignore_case:
+            prefix = prefix.lower()
+        keys, words = self._keys, self._words
+        limit = limit or self.limit
+        out = []
+        i = bisect_left(keys, prefix)
+        # the words with this prefix are a contiguous run from `i`.
+        for k in range(i, min(i + limit + 1, len(keys))):
+            if not keys[k].startswith(prefix):
+                break
+            if keys[k] != prefix:
+                out.append(words[k])
+        return out[:limit]
@@ -83,7 +83,7 @@ class Focusable:
         # self.on_focus_changed = signal(int, bool)
         #   param#2: bool: True if goes to next, False goes to previous.
         
-        self.on_focused.connect(self._scope.change_focus, is_async=True)
+        self.on_focused.connect(self._scope.change_focus)
         self._scope.add(self._uid, self)
     
     async def gain_focus(self, _notify=True):
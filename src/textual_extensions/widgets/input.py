@@ -1,36 +1,54 @@
-from string import printable
+from asyncio import current_task
+from asyncio import get_running_loop
+from collections import deque
+from inspect import isawaitable
 
+from rich.cells import cell_len
+from rich.cells import get_character_cell_size
 from rich.panel import Panel
+from rich.text import Text
 from textual import events
 from textual.keys import Keys
 from textual.reactive import Reactive
 
 from .focus_scope import Focusable
 from .widget import Widget
+from ..core import blink_clock
+from ..core import event_bus
 from ..core import signal
 
 
+_PASTED_WHITESPACES = (
+    Keys.Enter, Keys.ControlM, Keys.ControlJ, Keys.Tab, Keys.ControlI
+)
+
+
 class Input(Widget, Focusable):
     # TODO: features in progress:
     #   - copy, clip and paste
     #   - selection (mouse selection and keyboard selection)
     #   - jump by word (ctrl + left, ctrl + right)
-    #   - auto complete (popup or inline prompt text)
-    # FIXME:
-    #   - when text is too long to show, the cursor will be out of the visible
-    #     zone.
+    #   - auto complete in popup (the inline prompt text is done, see
+    #     `completer`)
     on_submitted = signal(str)
     _focused = Reactive(False)
     _padding: int
     _placeholder = ''
     _typed_chars: 'TypedChars'
+    _burst_window: float = 0.004
     
     def __init__(
             self, text='', placeholder='', *,
             cursor_blink=True, cursor_bold=False, cursor_shape='_',
             focus_scope=None, keep_focus_after_submit=True, padding=1,
-            show_border=False,
+            show_border=False, completer=None,
     ):
+        """
+        args:
+            completer: optional[callable]. suggests completions, shown as dim
+                text after the cursor. `tab` or `right` accepts it, `escape`
+                dismisses it. see `widgets/completion.py`.
+        """
         Widget.__init__(self)
         Focusable.__init__(self, focus_scope)
         #   Focusable provides:
@@ -41,6 +59,18 @@ class Input(Widget, Focusable):
         self._keep_focus_after_submit = keep_focus_after_submit
         self._padding = padding
         self._placeholder = placeholder
+        self._render_cache = {}  # dict[bool blink, renderable]
+        self._render_key = None
+        self._scroll = 0  # the index of the first visible char.
+        self._burst_handle = None  # optional[asyncio.TimerHandle]
+        self._completer = completer
+        self._completion = ''  # the ghost text after the cursor.
+        self._completion_key = None  # see `_update_completion`.
+        self._completion_task = None  # optional[asyncio.Task]
+        self._burst_last = 0.0  # the loop time of the last queued key.
+        self._pending_chars = []
+        #   list[str]. the queued chars and whitespace keys, see
+        #   `_queue_chars`.
         self._show_border = show_border
         self._typed_chars = TypedChars(
             text,
@@ -48,140 +78,224 @@ class Input(Widget, Focusable):
             shape=cursor_shape
         )
         
-        if cursor_blink:
-            ''' the blinking style
-            
-            i use `(bool) Cursor.blink` and [`Input.set_interval`][1] to
-            control the blinking status in an infinite time-loop.
-            
-            the default value of `Cursor.blink` is True. True means showing a
-            solid cursor, False means (temporarily) disappeared.
-            
-            if caller says "there's no need to blink", `set_interval` won't be
-            enabled, that means `Cursor.blink`s value would stay in True.
-            
-            btw i don't use [tmux-schmooze][2]'s scheme, because the blink tag
-            rendered by rich looks very "laggy" (i think its interval is too
-            long).
-            
-            [1]: https://github.com/Textualize/textual/blob/4d94df81e44b27fff52f
-                 0e38f4f109212e9e8c8a/docs/examples/timers/clock.py
-            [2]: https://github.com/camgraff/tmux-schmooze/blob/master/tmux_
-                 schmooze/ui.py
-            '''
-            
-            def blinking():
-                if self._focused:
-                    cursor = self._typed_chars.get_cursor()
-                    cursor.blink = not cursor.blink
-                    self.refresh()
-            
-            self.set_interval(0.6, blinking)  # suggest 0.5~0.7s
+        self._cursor_blink = cursor_blink
+        ''' the blinking style
+        
+        i use `(bool) Cursor.blink` and the shared `blink_clock` to control
+        the blinking status. the clock ticks only focused inputs, and all of
+        them get the same phase, so 200 inputs on a form don't mean 200
+        timers.
+        
+        the default value of `Cursor.blink` is True. True means showing a
+        solid cursor, False means (temporarily) disappeared.
+        
+        if caller says "there's no need to blink", the input is not
+        registered to the clock, that means `Cursor.blink`s value would stay
+        in True.
+        
+        btw i don't use [tmux-schmooze][1]'s scheme, because the blink tag
+        rendered by rich looks very "laggy" (i think its interval is too
+        long).
+        
+        [1]: https://github.com/camgraff/tmux-schmooze/blob/master/tmux_
+             schmooze/ui.py
+        '''
     
     def render(self):
+        # the renderable is cached per (text version, cursor index, focus,
+        # width), with one variant per blink state. so a blink tick only
+        # swaps the cached variants, nothing is rebuilt or re-parsed.
+        chars = self._typed_chars
+        cursor = chars.get_cursor()
+        key = (
+            chars, chars.version, cursor.index, self._focused,
+            self._size.width, self._completion
+        )
+        if key != self._render_key:
+            self._render_key = key
+            self._render_cache.clear()
+        if (out := self._render_cache.get(cursor.blink)) is None:
+            out = self._render_cache[cursor.blink] = self._build_renderable()
+        return out
+    
+    def _build_renderable(self):
+        # only the visible slice of the chars is read, measured in terminal
+        # cells (wide chars take 2 cells). a 100kb value costs the same as a
+        # short one.
+        chars = self._typed_chars
+        cursor = chars.get_cursor()
+        width = self._content_width
+        text = Text(' ' * self._padding, style='default on #444444', end='')
         if self._focused:
-            # notice:
-            #   there is a point that, if cursor shape is '_' or '▉', and the
-            #   cursor is at the end, `self._typed_chars` has to add an
-            #   additional whitespace to make sure tailed cursor can be
-            #   rendered. but we need to strip this whitespace otherwise it
-            #   causes `self._fill_bg` incorrect its background width.
-            # noinspection PyProtectedMember
-            if self._typed_chars._cursor.shape != '|' and \
-                    self._typed_chars and \
-                    self._typed_chars._is_end:
-                rich_text = self._fill_bg(
-                    self._typed_chars.rich_text_with_cursor,
-                    len(self._typed_chars.text_with_cursor) + 1  # <- +1
-                )
+            i = cursor.index
+            a = chars.get_chars(self._follow_cursor(width), i)
+            text.append(a, 'default')
+            used = cell_len(a)
+            # the completion is shown only when the cursor is at the end.
+            ghost = self._completion if i == len(chars) else ''
+            if cursor.shape == '|':
+                text.append('|', cursor.style if cursor.blink else 'dim')
+                text.append(self._take_cells(i, width - used - 1), 'default')
+                text.append(_crop_cells(ghost, width - used - 1), 'dim')
             else:
-                rich_text = self._fill_bg(
-                    self._typed_chars.rich_text_with_cursor,
-                    len(self._typed_chars.text_with_cursor)
-                )
-        else:
-            if self._typed_chars:
-                rich_text = self._fill_bg(
-                    self._typed_chars.rich_text,
-                    len(self._typed_chars.text)
-                )
-            else:  # show placeholder.
-                # FIXME: if placeholder contains rich markup, the spacing in
-                #   the tail will be truncated.
-                rich_text = self._fill_bg(
-                    # a little darker on grey background.
-                    '[#ABA7B9 on #444444]{}[/]'.format(self._placeholder),
-                    len(self._placeholder)
-                )
+                # the cursor takes the char under it, or the first char of
+                # the completion, or an additional whitespace at the end.
+                under = chars.get_chars(i, i + 1) or ghost[:1] or ' '
+                text.append(under, cursor.style if cursor.blink else (
+                    'dim' if ghost else 'default'
+                ))
+                rest = width - used - cell_len(under)
+                text.append(self._take_cells(i + 1, rest), 'default')
+                text.append(_crop_cells(ghost[1:], rest), 'dim')
+        elif chars:
+            text.append(self._take_cells(0, width), 'default')
+        else:  # show placeholder. a little darker on grey background.
+            text.append(Text.from_markup(
+                self._placeholder, style='#ABA7B9 on #444444'
+            ))
+        if (rest := width - text.cell_len + self._padding) > 0:
+            text.append(' ' * rest)
+        text.append(' ' * self._padding)
         
         if self._show_border:
-            return Panel(
-                '[default on #444444]{0}{1}{0}[/]'.format(
-                    ' ' * self._padding, rich_text
-                ), border_style='blue'
-            )
+            return Panel(text, border_style='blue')
         else:
-            return '[default on #444444]{0}{1}{0}[/]'.format(
-                ' ' * self._padding, rich_text
-            )
+            return text
+    
+    def _follow_cursor(self, width: int) -> int:
+        """
+        update the horizontal scroll offset to keep the cursor visible.
+        
+        returns: int. the index of the first visible char.
+        """
+        chars = self._typed_chars
+        cursor = chars.get_cursor()
+        i = cursor.index
+        if i <= self._scroll:
+            self._scroll = i
+            return i
+        if cursor.shape == '|':
+            room = width - 1
+        else:
+            room = width - cell_len(chars.get_chars(i, i + 1) or ' ')
+        # walk back from the cursor, at most `room` cells.
+        before = chars.get_chars(max(i - room, self._scroll), i)
+        used, k = 0, len(before)
+        while k > 0:
+            w = get_character_cell_size(before[k - 1])
+            if used + w > room:
+                break
+            used += w
+            k -= 1
+        if (start := i - len(before) + k) > self._scroll:
+            self._scroll = start
+        return self._scroll
+    
+    def _take_cells(self, start: int, cells: int) -> str:
+        """ the chars from `start` that fit in `cells` terminal cells. """
+        if cells <= 0:
+            return ''
+        return _crop_cells(
+            self._typed_chars.get_chars(start, start + cells), cells
+        )
+    
+    def _index_at_cell(self, x: int) -> int:
+        """ map a cell offset (relative to the visible zone) to char index. """
+        out = self._typed_chars.get_chars(self._scroll, self._scroll + x + 1)
+        used = 0
+        for k, char in enumerate(out):
+            used += get_character_cell_size(char)
+            if used > x:
+                return self._scroll + k
+        return self._scroll + len(out)
     
     # -------------------------------------------------------------------------
     
     # == events ==
     
     async def on_click(self, event: events.Click):
+        if not self._focused:
+            # an unfocused input shows its text from the start.
+            self._scroll = 0
         await self.gain_focus()
         offset = 2 if self._show_border else 0
-        self._typed_chars.activate(max((event.x - self._padding - offset, 0)))
+        self._typed_chars.activate(self._index_at_cell(
+            max((event.x - self._padding - offset, 0))
+        ))
         self.refresh()
         event.prevent_default()
     
     async def on_key(self, event: events.Key):
         if not self._focused: return
         event.prevent_default()
+        key = event.key
         
-        # normal inputs
-        is_changed = None
-        if event.key in printable:
-            is_changed = self._typed_chars.add(event.key)
-        
+        # normal inputs: any printable char, not only ascii (cjk, accented
+        # letters, etc.). key names like 'enter' are longer than one char.
+        # they are queued and inserted in bulk, see `_queue_chars`.
+        if len(key) == 1 and key.isprintable():
+            self._queue_chars(key)
+            return
+        if self._pending_chars and key in _PASTED_WHITESPACES:
+            # a line break or tab in the middle of a burst is most likely
+            # pasted, it's queued too. see `_flush_chars`.
+            self._queue_chars(key)
+            return
+        # the queued chars (and keys) go first, keep the order of keys.
+        self._flush_chars()
+        for pending in self._pop_pending_keys():
+            await self._handle_key(pending)
+        await self._handle_key(key)
+    
+    async def _handle_key(self, key: str):
         # manipulate existed chars and move cursor
         
-        elif event.key in (Keys.Backspace, Keys.ControlH):
+        is_changed = None
+        if key in (Keys.Backspace, Keys.ControlH):
             # backspace is recognized as `control + h` in unix system.
             is_changed = self._typed_chars.del_left()
         
-        elif event.key == Keys.Delete:
+        elif key == Keys.Delete:
             is_changed = self._typed_chars.del_right()
         
+        elif key == Keys.ControlZ:
+            is_changed = self._typed_chars.undo()
+        elif key == Keys.ControlY:
+            is_changed = self._typed_chars.redo()
+        
         # focus changed
         
-        elif event.key == Keys.Enter:
+        elif key == Keys.Enter:
             await self.on_submitted.emit(self.text)
             if not self._keep_focus_after_submit:
                 self._focused = False
                 is_changed = True
         
-        elif event.key == Keys.Escape:
-            self._focused = False
+        elif key == Keys.Escape:
+            if self._completion:
+                self._cancel_completion()
+            else:
+                self._focused = False
             is_changed = True
         
-        elif event.key in (Keys.Tab, Keys.ControlI):
-            await self._scope.focus_next()
+        elif key in (Keys.Tab, Keys.ControlI):
+            if not (is_changed := self._accept_completion()):
+                await self._scope.focus_next()
         
-        elif event.key == 'shift+tab':
+        elif key == 'shift+tab':
             await self._scope.focus_prev()
         
         # navigation
         
-        elif event.key == Keys.End:
+        elif key == Keys.End:
             is_changed = self._typed_chars.move('end')
-        elif event.key == Keys.Home:
+        elif key == Keys.Home:
             is_changed = self._typed_chars.move('start')
-        elif event.key == Keys.Left:
+        elif key == Keys.Left:
             is_changed = self._typed_chars.move('left')
-        elif event.key == Keys.Right:
-            is_changed = self._typed_chars.move('right')
+        elif key == Keys.Right:
+            is_changed = self._typed_chars.move('right') or \
+                         self._accept_completion()
         
         # remind: `is_changed` now is None, True, or False at the time.
         if is_changed is True:
@@ -191,40 +305,194 @@ class Input(Widget, Focusable):
             cursor = self._typed_chars.get_cursor()
             cursor.blink = True
             self.refresh()
+            self._update_completion()
+    
+    def _queue_chars(self, chars: str):
+        """
+        a paste (or a fast typist) sends a burst of key events. the chars are
+        collected and inserted at once when the burst pauses for
+        `_burst_window` seconds, with one refresh. a single key press is
+        delayed by the window only (a few ms).
+        
+        note: textual doesn't support bracketed paste, a paste is told apart
+        from typing only by its speed.
+        """
+        loop = get_running_loop()
+        self._pending_chars.append(chars)
+        self._burst_last = loop.time()
+        if self._burst_handle is None:
+            self._burst_handle = loop.call_at(
+                self._burst_last + self._burst_window,
+                self._on_burst_timer, loop
+            )
+    
+    def _on_burst_timer(self, loop):
+        # the timer is armed once per burst, not per key. if keys came after
+        # it was armed, wait until the burst pauses.
+        wait = self._burst_last + self._burst_window - loop.time()
+        if wait > 0:
+            self._burst_handle = loop.call_later(
+                wait, self._on_burst_timer, loop
+            )
+            return
+        self._burst_handle = None
+        self._flush_chars()
+        if keys := self._pop_pending_keys():
+            event_bus.spawn(self._handle_keys(keys))
+    
+    def _flush_chars(self):
+        """
+        insert the queued chars. the input is single line, the queued line
+        breaks and tabs between them become spaces. the ones at the end of the
+        burst are real key presses (e.g. 'abc' + enter from a barcode
+        scanner, or a pasted line ending with a line break), they stay in
+        `_pending_chars` for the caller, see `_pop_pending_keys`.
+        """
+        pending = self._pending_chars
+        # chars are one-char strings, keys are names like 'enter'.
+        n = len(pending)
+        while n and len(pending[n - 1]) > 1:
+            n -= 1
+        if not n:
+            return
+        self._typed_chars.add(''.join(
+            x if len(x) == 1 else ' ' for x in pending[:n]
+        ))
+        del pending[:n]
+        self._typed_chars.get_cursor().blink = True
+        self.refresh()
+        self._update_completion()
+    
+    def _pop_pending_keys(self) -> list:
+        """ call it after `_flush_chars`, only keys are left then. """
+        keys, self._pending_chars = self._pending_chars, []
+        return keys
+    
+    async def _handle_keys(self, keys):
+        # spawned by `_on_burst_timer`, the bus reports its exceptions.
+        for key in keys:
+            await self._handle_key(key)
+    
+    # == completion ==
+    
+    def _update_completion(self):
+        """
+        look up completions for the current text, when the text or the
+        cursor changed and the cursor is at the end.
+        
+        a sync completer is called right here. an async one runs in a task,
+        the previous task is cancelled first, so a stale result never shows
+        up and a slow source never blocks typing.
+        """
+        chars = self._typed_chars
+        cursor = chars.get_cursor()
+        key = (chars, chars.version, cursor.index)
+        if self._completer is None or key == self._completion_key:
+            return
+        self._completion_key = key
+        self._cancel_completion()
+        if not chars or cursor.index != len(chars):
+            return
+        text = str(chars)
+        result = self._completer(text)
+        if isawaitable(result):
+            self._completion_task = event_bus.spawn(
+                self._await_completion(result, text)
+            )
+        else:
+            self._set_completion(text, result)
+    
+    async def _await_completion(self, result, text: str):
+        # spawned by `_update_completion`, the bus reports its exceptions.
+        try:
+            candidates = await result
+        finally:
+            # don't clear the task of a newer lookup.
+            if self._completion_task is current_task():
+                self._completion_task = None
+        self._set_completion(text, candidates)
+    
+    def _set_completion(self, text: str, candidates):
+        """
+        args:
+            text: str. the text that was completed. if it's not the current
+                text anymore, the candidates are dropped.
+            candidates: optional[list[str]]. the first one that extends
+                `text` is shown.
+        """
+        if not candidates or text != str(self._typed_chars):
+            return
+        for candidate in candidates:
+            if len(candidate) > len(text) and \
+                    candidate[:len(text)].lower() == text.lower():
+                self._completion = candidate[len(text):]
+                self.refresh()
+                return
+    
+    def _cancel_completion(self):
+        if self._completion_task is not None:
+            self._completion_task.cancel()
+            self._completion_task = None
+        self._completion = ''
+    
+    def _accept_completion(self) -> bool:
+        chars = self._typed_chars
+        if not self._completion or chars.get_cursor().index != len(chars):
+            return False
+        # one edit in the history, one `ctrl + z` takes it back.
+        chars.add(self._completion)
+        self._completion = ''
+        return True
     
     async def watch__focused(self, focus: bool):
         if focus:
             await self.focus()
+        else:
+            self._cancel_completion()
+            self._completion_key = None
+        if self._cursor_blink:
+            if focus:
+                blink_clock.add(self)
+            else:
+                blink_clock.remove(self)
+        self._typed_chars.get_cursor().blink = True
         self.refresh()  # inherit from `Widget`
     
+    def on_blink(self, phase: bool):
+        """ called by `blink_clock` when this input is focused. """
+        cursor = self._typed_chars.get_cursor()
+        if cursor.blink != phase:
+            cursor.blink = phase
+            self.refresh()
+    
     # == properties ==
     
     @property
     def length(self):
+        self._flush_chars()
         return len(self._typed_chars)
     
     @property
     def text(self):
+        self._flush_chars()
         return self._typed_chars.text
     
     # == other ==
     
     @property
     def _content_width(self):
-        return self._size.width - self._padding * 2
-    
-    def _fill_bg(self, text: str, length=None):
-        if length is None:
-            length = len(text)
-        if length < self._content_width:
-            text += ' ' * (self._content_width - length)
-        return text
+        # the border and the panel's own padding take 2 cells each side.
+        return self._size.width - self._padding * 2 - (
+            4 if self._show_border else 0
+        )
     
     # def lose_focus(self, _notify=True):
     #     super().lose_focus(_notify)
     #     self.refresh()
     
     def set_text(self, text: str):
+        self._pending_chars.clear()
+        self._cancel_completion()
         if self._typed_chars.text != text:
             self._typed_chars = TypedChars(
                 # FIXME: use TypedCharsFactory to re-create TypedChars instance.
@@ -233,27 +501,83 @@ class Input(Widget, Focusable):
             self.refresh()
 
 
+def _crop_cells(text: str, cells: int) -> str:
+    """ the leading chars of `text` that fit in `cells` terminal cells. """
+    if cells <= 0:
+        return ''
+    if cell_len(text) <= cells:
+        return text
+    used = 0
+    for k, char in enumerate(text):
+        used += get_character_cell_size(char)
+        if used > cells:
+            return text[:k]
+    return text
+
+
 class TypedChars:
+    """
+    the chars are stored in a gap buffer: two lists around the cursor, the
+    right one is reversed. so typing and deleting at the cursor are O(1)
+    (`list.append` and `list.pop`). moving the cursor doesn't touch the
+    lists, the gap follows the cursor lazily on the next edit.
+    
+    the joined text, and the text parts left and right of the cursor, are
+    cached until the chars or the cursor change.
+    
+    every edit is recorded in an `EditHistory` for `undo` and `redo`.
+    """
     _cursor: 'Cursor'
-    _typed_chars: list
+    _left: list  # list[str]. chars before the gap.
+    _right: list  # list[str]. chars after the gap, in reversed order.
     
-    def __init__(self, text: str = '', **cursor_kwargs):
+    def __init__(self, text: str = '', history_bytes=64 << 10,
+                 **cursor_kwargs):
+        """
+        args:
+            history_bytes: int. the memory cap of the undo history, see
+                `EditHistory`.
+        """
         self._cursor = Cursor(**cursor_kwargs)
-        self._typed_chars = [x for x in text]
+        self._history = EditHistory(history_bytes)
+        self._left = list(text)
+        self._right = []
+        self._text = text  # optional[str]. None means dirty.
+        self.version = 0  # increases on every change of the chars.
+        self._parts = None
+        #   optional[tuple[int cursor_index, str text, str left, str right]]
     
     def __bool__(self):
-        return bool(self._typed_chars)
+        return bool(self._left or self._right)
     
     def __len__(self):
-        return len(self._typed_chars)
+        return len(self._left) + len(self._right)
     
     def __str__(self):
-        return ''.join(self._typed_chars)
+        if self._text is None:
+            self._text = ''.join(self._left) + ''.join(reversed(self._right))
+        return self._text
     
     def get_cursor(self) -> 'Cursor':
         # use this method only for special purpose.
         return self._cursor
     
+    def get_chars(self, start: int, stop: int) -> str:
+        """ the text in [start, stop), without joining the whole text. """
+        if self._text is not None:
+            return self._text[start:stop]
+        left, right = self._left, self._right
+        n, r = len(left), len(right)
+        start, stop = max(start, 0), min(stop, n + r)
+        if start >= stop:
+            return ''
+        out = ''.join(left[start:stop]) if start < n else ''
+        if stop > n:
+            # `right` is reversed, the logical [a, b) is right[r-b:r-a].
+            a, b = max(start, n) - n, stop - n
+            out += ''.join(reversed(right[r - b:r - a]))
+        return out
+    
     # @property
     # def length(self):
     #     return len(self._typed_chars)
@@ -268,7 +592,7 @@ class TypedChars:
     
     @property
     def _is_end(self):
-        return self._cursor.index == len(self._typed_chars)
+        return self._cursor.index == len(self)
     
     # -------------------------------------------------------------------------
     # manipulate existed chars and/or move cursor.
@@ -277,42 +601,51 @@ class TypedChars:
     #   False: nothing changed.
     
     def add(self, char: str) -> bool:
-        if self._is_end:
-            self._typed_chars.append(char)
-            self._cursor.to_right()
-            return True
-        else:
-            self._typed_chars.insert(self._cursor.index, char)
-            self._cursor.to_right()
-            return True
+        """
+        args:
+            char: str. usually one char, a longer string is inserted as a
+                whole.
+        """
+        if not char:
+            return False
+        i = self._cursor.index
+        self._history.record('insert', i, char, i)
+        self._move_gap()
+        self._left.extend(char)
+        self._changed()
+        self._cursor.index += len(char)
+        return True
     
     def del_left(self):
-        if not self._typed_chars:
+        if self._is_start:
             return False
-        if self._is_end:
-            self._typed_chars.pop()
-            self._cursor.to_left()
-            return True
-        else:
-            self._typed_chars.pop(self._cursor.index - 1)
-            self._cursor.to_left()
-            return True
+        self._move_gap()
+        i = self._cursor.index
+        self._history.record('delete', i - 1, self._left.pop(), i)
+        self._changed()
+        self._cursor.to_left()
+        return True
     
     def del_right(self) -> bool:
-        if not self._typed_chars or self._is_end:
+        if self._is_end:
             return False
-        else:
-            self._typed_chars.pop(self._cursor.index)
-            return True
+        self._move_gap()
+        i = self._cursor.index
+        self._history.record('delete', i, self._right.pop(), i)
+        self._changed()
+        return True
     
     # alias
     ldel = del_left
     rdel = del_right
     
     def clear(self) -> bool:
-        if not self._typed_chars:
+        if not self:
             return False
-        self._typed_chars.clear()
+        self._history.record('delete', 0, str(self), self._cursor.index)
+        self._left.clear()
+        self._right.clear()
+        self._changed()
         self._cursor.to_start()
         return True
     
@@ -326,39 +659,103 @@ class TypedChars:
         elif to == 'left':
             return self._cursor.to_left()
         elif to == 'right':
-            return self._cursor.to_right(len(self._typed_chars))
+            return self._cursor.to_right(len(self))
         elif to == 'end':
-            return self._cursor.to_end(len(self._typed_chars))
+            return self._cursor.to_end(len(self))
         else:
             raise ValueError('invalid move direction: {}'.format(to))
     
     def activate(self, x: int) -> bool:
-        self._cursor.activate(x, len(self._typed_chars))
+        self._cursor.activate(x, len(self))
+        return True
+    
+    def undo(self) -> bool:
+        """ returns: bool. False if there is nothing to undo. """
+        if (edit := self._history.pop_undo()) is None:
+            return False
+        if edit.kind == 'insert':
+            self._delete_at(edit.index, edit.length)
+        else:
+            self._insert_at(edit.index, edit.text)
+        self._cursor.index = edit.cursor
+        return True
+    
+    def redo(self) -> bool:
+        """ returns: bool. False if there is nothing to redo. """
+        if (edit := self._history.pop_redo()) is None:
+            return False
+        if edit.kind == 'insert':
+            self._insert_at(edit.index, edit.text)
+            self._cursor.index = edit.index + edit.length
+        else:
+            self._delete_at(edit.index, edit.length)
+            self._cursor.index = edit.index
         return True
     
+    def _insert_at(self, index: int, text: str):
+        """ insert without recording, the cursor is left at `index`. """
+        self._cursor.index = index
+        self._move_gap()
+        self._left.extend(text)
+        self._changed()
+        self._cursor.index = index
+    
+    def _delete_at(self, index: int, length: int):
+        """ delete without recording, the cursor is left at `index`. """
+        self._cursor.index = index
+        self._move_gap()
+        del self._right[len(self._right) - length:]
+        self._changed()
+    
+    def _changed(self):
+        self._text = None
+        self.version += 1
+    
+    def _move_gap(self):
+        """ move the gap to the cursor, O(distance). """
+        i = self._cursor.index
+        left, right = self._left, self._right
+        if i < len(left):
+            moved = left[i:]
+            del left[i:]
+            moved.reverse()
+            right.extend(moved)
+        elif i > len(left):
+            n = i - len(left)
+            moved = right[-n:]
+            del right[-n:]
+            moved.reverse()
+            left.extend(moved)
+    
+    def split_at_cursor(self):
+        """ returns: tuple[str left, str right]. the text around cursor. """
+        i = self._cursor.index
+        text = str(self)
+        # `self._text` is rebuilt after every edit, so the identity check
+        # tells if the text changed.
+        if self._parts is None or self._parts[0] != i or \
+                self._parts[1] is not text:
+            self._parts = (i, text, text[:i], text[i:])
+        return self._parts[2], self._parts[3]
+    
     # -------------------------------------------------------------------------
     
     @property
     def rich_text(self):
-        return '[default]{}[/]'.format(''.join(self._typed_chars))
+        return '[default]{}[/]'.format(str(self))
     
     @property
     def rich_text_with_cursor(self):
-        if not self._typed_chars:
+        if not self:
             return self._cursor.get_rich_cursor()
         
-        a, b = (
-            self._typed_chars[:self._cursor.index],
-            self._typed_chars[self._cursor.index:],
-        )
+        a, b = self.split_at_cursor()
         if self._cursor.shape == '|':
+            return '{}{}{}'.format(a, self._cursor.get_rich_cursor(), b)
+        else:
             return '{}{}{}'.format(
-                ''.join(a), self._cursor.get_rich_cursor(), ''.join(b)
+                a, self._cursor.get_rich_cursor(b[:1] or ' '), b[1:]
             )
-        else:
-            if not b: b.append(' ')
-            b[0] = self._cursor.get_rich_cursor(b[0])
-            return '{}{}'.format(''.join(a), ''.join(b))
     
     @property
     def text(self):
@@ -366,27 +763,138 @@ class TypedChars:
     
     @property
     def text_with_cursor(self):
-        if not self._typed_chars:
+        if not self:
             return self._cursor.shape
         
-        a, b = (
-            self._typed_chars[:self._cursor.index],
-            self._typed_chars[self._cursor.index:],
-        )
-        
         if self._cursor.shape == '|':
-            return '{}{}{}'.format(
-                ''.join(a),
-                self._cursor.shape,
-                ''.join(b),
-            )
+            a, b = self.split_at_cursor()
+            return '{}{}{}'.format(a, self._cursor.shape, b)
         else:
             # warning: the cursor is invisible in this function.
             # suggest using `self.rich_text_with_cursor` instead.
-            return '{}{}'.format(
-                ''.join(a),
-                ''.join(b),
-            )
+            return str(self)
+
+
+class EditHistory:
+    """
+    the undo/redo log of `TypedChars`. a record is a delta -- what was
+    inserted or deleted, and where -- not a snapshot of the text, so the
+    memory depends on how much was typed, not on how long the text is.
+    
+    consecutive single char edits are merged into one record (a run), so one
+    undo reverts a typed word, or a held backspace, at once. a bulk insert
+    (e.g. a paste) is a record by itself.
+    
+    when the records exceed `max_bytes` (the utf-8 size of their text plus a
+    fixed overhead per record), the oldest ones are dropped. a single record
+    larger than `max_bytes` is not kept at all.
+    """
+    _overhead = 64  # the estimated bytes of a record besides its text.
+    
+    def __init__(self, max_bytes=64 << 10):
+        self.max_bytes = max_bytes
+        self.size = 0  # the estimated bytes of all records.
+        self._undo = deque()  # deque[_Edit]
+        self._redo = []  # list[_Edit]
+    
+    def __len__(self):
+        return len(self._undo)
+    
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+    
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+    
+    def record(self, kind: str, index: int, text: str, cursor: int):
+        """
+        args:
+            kind: literal['insert', 'delete']
+            index: int. where the text was inserted, or the index of the
+                first deleted char (before the deletion).
+            text: str. the inserted or deleted text.
+            cursor: int. the cursor index before the edit.
+        """
+        if self._redo:
+            self.size -= sum(map(_Edit.get_size, self._redo))
+            self._redo.clear()
+        if self._undo and self._undo[-1].merge(kind, index, text):
+            self.size += len(text.encode('utf-8'))
+        else:
+            edit = _Edit(kind, index, text, cursor)
+            self._undo.append(edit)
+            self.size += edit.get_size()
+        while self.size > self.max_bytes and self._undo:
+            self.size -= self._undo.popleft().get_size()
+    
+    def pop_undo(self):
+        """ returns: optional[_Edit] """
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        # an undone run is closed, new typing starts a new record.
+        edit.mergeable = False
+        self._redo.append(edit)
+        return edit
+    
+    def pop_redo(self):
+        """ returns: optional[_Edit] """
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._undo.append(edit)
+        return edit
+    
+    def clear(self):
+        self.size = 0
+        self._undo.clear()
+        self._redo.clear()
+
+
+class _Edit:
+    __slots__ = ('cursor', 'index', 'kind', 'length', 'mergeable', '_head',
+                 '_tail')
+    
+    def __init__(self, kind: str, index: int, text: str, cursor: int):
+        self.cursor = cursor
+        self.index = index
+        self.kind = kind
+        self.length = len(text)
+        self.mergeable = len(text) == 1
+        # a run grows at both ends: backspaces prepend, typing and forward
+        # deletes append. `_head` is in reversed order, so both are
+        # `list.append`.
+        self._head = []  # list[str]
+        self._tail = [text]  # list[str]
+    
+    @property
+    def text(self) -> str:
+        if self._head or len(self._tail) > 1:
+            self._tail = [''.join(reversed(self._head)) + ''.join(self._tail)]
+            self._head = []
+        return self._tail[0]
+    
+    def get_size(self) -> int:
+        return EditHistory._overhead + len(self.text.encode('utf-8'))
+    
+    def merge(self, kind: str, index: int, text: str) -> bool:
+        if not self.mergeable or kind != self.kind or len(text) != 1:
+            return False
+        if kind == 'insert':
+            if index != self.index + self.length:
+                return False
+            self._tail.append(text)
+        elif index == self.index:  # forward delete
+            self._tail.append(text)
+        elif index == self.index - 1:  # backspace
+            self._head.append(text)
+            self.index = index
+        else:
+            return False
+        self.length += 1
+        return True
 
 
 class Cursor:
@@ -395,6 +903,7 @@ class Cursor:
     #   see also `Input : (attr) __blinking`.
     index: int  # starts from 0. it indicates the left side of current char.
     shape: str
+    style: str  # rich style of the (solid) cursor.
     _rich_shape: str
     
     def __init__(self, shape='_', bold=False):
@@ -423,22 +932,15 @@ class Cursor:
         self.index = 0
         self.shape = shape
         
-        self._rich_shape = '[{0} {1}]{2}[/]'.format(
-            'bold' if bold else '',
-            {
-                '_': 'u color(36)',  # blue underline
-                '|': 'color(36)',  # blue
-                '▉': 'color(16) on green',  # grey on green
-            }[shape],
-            '|' if shape == '|' else '{char}'
+        self.style = ('bold ' if bold else '') + {
+            '_': 'u color(36)',  # blue underline
+            '|': 'color(36)',  # blue
+            '▉': 'color(16) on green',  # grey on green
+        }[shape]
+        self._rich_shape = '[{}]{}[/]'.format(
+            self.style, '|' if shape == '|' else '{char}'
             #   about '{char}': see `self.get_rich_cursor`.
         )
-        # (chore) polish style markup format.
-        if not bold:
-            self._rich_shape = self._rich_shape.replace('[ ', '[', 1)
-        #   before: '[ u color(36)]|[/]'
-        #   after : '[u color(36)]|[/]'
-        #             ^ remove redundant space besides left bracket.
     
     def activate(self, x: int, text_length: int):
         self.index = min((x, text_length))
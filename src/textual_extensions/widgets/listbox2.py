@@ -160,8 +160,11 @@ class ListBox(Widget):
                 self._to_most_end()
     
     async def on_mouse_move(self, event):
-        self._highlighted_index = event.y
-        self.refresh()
+        # mouse move events come at terminal event rate, most of them don't
+        # change the highlighted row.
+        if self._highlighted_index != event.y:
+            self._highlighted_index = event.y
+            self.refresh()
     
     async def on_mouse_scroll_up(self, _):
         # note: in textual, (look through left side of your mouse), the
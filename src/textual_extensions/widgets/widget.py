@@ -1,6 +1,7 @@
 from textual.widget import Widget as BaseWidget
 
 from ..core.event_engine import SignalSupport
+from ..core.event_engine import event_bus
 
 __all__ = ['Widget']
 
@@ -9,3 +10,6 @@ class Widget(BaseWidget, SignalSupport):
     def __init__(self, name=None):
         BaseWidget.__init__(self, name)
         SignalSupport.__init__(self)
+        # widgets are usually created in the app's loop, bind it for the
+        # worker threads which emit signals.
+        event_bus.try_bind_loop()